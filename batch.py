@@ -0,0 +1,231 @@
+"""
+Headless batch runner for the analysis pipeline, for cron jobs on a worker box.
+
+Examples:
+    python batch.py analyze urls.txt --source "partner list" --workers 8
+    python batch.py search queries.txt --num-results 50 --language es --skip-duplicates
+    python batch.py analyze urls.txt --sink sheets --sheet-id ID --keywords-id ID --credentials creds.json
+    python batch.py domains urls.txt --sheet-id ID --keywords-id ID --credentials creds.json
+    python batch.py crawl --max-pages 500 --sync --drive-file-id ID --credentials creds.json
+    python batch.py recrawl --limit 1000 --workers 16
+"""
+import sys
+import logging
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from reporting import LoggingReporter, set_reporter, get_reporter
+from database import DB_PATH, create_connection, create_tables, insert_item, fetch_good_bad_words, rescore_items
+from keywords import fetch_keyword_expansions
+from dedup import find_duplicates
+from tools import analyze_url, process_single_url, search_and_filter_urls, domain_split, fetch_and_get_keywords, check_and_add_headers, update_google_sheets
+
+
+# Google API scopes, same as the app
+SCOPES = [
+    "https://spreadsheets.google.com/feeds",
+    "https://www.googleapis.com/auth/spreadsheets",
+    "https://www.googleapis.com/auth/drive"
+]
+BATCH_SIZE = 50
+
+
+# Function to read non-empty, non-comment lines from a file, or stdin for '-'
+def read_lines(path):
+    file = sys.stdin if path == "-" else open(path, encoding="utf-8")
+    try:
+        return [line.strip() for line in file if line.strip() and not line.startswith("#")]
+    finally:
+        if file is not sys.stdin:
+            file.close()
+
+def load_credentials(path):
+    from google.oauth2 import service_account
+    return service_account.Credentials.from_service_account_file(path, scopes=SCOPES)
+
+def drive_service(credentials):
+    from googleapiclient.discovery import build
+    return build('drive', 'v3', credentials=credentials)
+
+# Function to analyze URLs concurrently and store them as items, in batched transactions
+def analyze_to_db(url_sources, db_path, workers, skip_duplicates=False):
+    """
+    :param skip_duplicates: Don't store pages that are near-duplicates of a stored item,
+                            including items stored earlier in the same run.
+    """
+    conn = create_connection(db_path)
+    create_tables(conn)
+    good_keywords, bad_keywords = fetch_good_bad_words(db_path)
+    keyword_expansions = fetch_keyword_expansions(conn)
+    existing = {url for (url,) in conn.execute("SELECT url FROM items")}
+    url_sources = [(url, source) for url, source in dict(url_sources).items() if url not in existing]
+    get_reporter().info(f"Analyzing {len(url_sources)} new URLs with {workers} workers")
+
+    def analyze(url_source):
+        return url_source, analyze_url(url_source[0], good_keywords, bad_keywords, keyword_expansions)
+
+    added = 0
+    batch = []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for (url, source), result in pool.map(analyze, url_sources):
+            title, description, translated_title, translated_description, languages, decision, details = result
+            if decision == "Error":
+                continue
+            batch.append((url, decision, details, source, title, description, translated_title, translated_description, "", "Automatically analyzed", ", ".join(languages)))
+            if len(batch) >= BATCH_SIZE:
+                added += _write_items(conn, batch, skip_duplicates)
+        added += _write_items(conn, batch, skip_duplicates)
+    conn.close()
+    get_reporter().success(f"Added {added} items to {db_path}")
+    return added
+
+def _write_items(conn, batch, skip_duplicates=False):
+    count = 0
+    with conn:
+        for row in batch:
+            url, title, description = row[0], row[4], row[5]
+            duplicates = find_duplicates(conn, title, description) if skip_duplicates else []
+            if duplicates:
+                get_reporter().write(f"Skipped '{url}', a near-duplicate of '{duplicates[0][1]}'")
+                continue
+            insert_item(conn, *row)
+            count += 1
+    batch.clear()
+    return count
+
+# Function to analyze URLs concurrently and append them to the Sure / Not Sure sheets
+def analyze_to_sheets(url_sources, client, sheet_id, keywords_id, workers):
+    _, sure_sheet, not_sure_sheet, good_keywords, bad_keywords = fetch_and_get_keywords(client, sheet_id, keywords_id)
+    check_and_add_headers(sure_sheet)
+    check_and_add_headers(not_sure_sheet)
+
+    def process(url_source):
+        return process_single_url(url_source[0], url_source[1], good_keywords, bad_keywords)
+
+    rows_to_sure, rows_to_not_sure = [], []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for row_data, score in pool.map(process, url_sources):
+            (rows_to_sure if score == "Yes" else rows_to_not_sure).append(row_data)
+            if len(rows_to_sure) + len(rows_to_not_sure) >= BATCH_SIZE:
+                update_google_sheets(rows_to_sure, rows_to_not_sure, sure_sheet, not_sure_sheet)
+                rows_to_sure, rows_to_not_sure = [], []
+    update_google_sheets(rows_to_sure, rows_to_not_sure, sure_sheet, not_sure_sheet)
+    get_reporter().success(f"Processed {len(url_sources)} URLs into sheet {sheet_id}")
+
+def analyze(url_sources, args):
+    if args.sink == "sheets":
+        import gspread
+        client = gspread.authorize(load_credentials(args.credentials))
+        analyze_to_sheets(url_sources, client, args.sheet_id, args.keywords_id, args.workers)
+    else:
+        analyze_to_db(url_sources, args.db, args.workers, args.skip_duplicates)
+
+def run(args):
+    if args.command == "analyze":
+        analyze([(url, args.source) for url in read_lines(args.file)], args)
+    elif args.command == "search":
+        url_sources = []
+        for query in read_lines(args.file):
+            url_sources.extend(search_and_filter_urls(query, args.num_results, args.language, args.homepage_only))
+        analyze(url_sources, args)
+    elif args.command == "domains":
+        import gspread
+        client = gspread.authorize(load_credentials(args.credentials))
+        domain_split(client, args.sheet_id, read_lines(args.file), args.source, args.keywords_id)
+    elif args.command == "crawl":
+        from crawler import crawl
+        conn = create_connection(args.db)
+        create_tables(conn)
+        good_keywords, bad_keywords = fetch_good_bad_words(args.db)
+        crawl(conn, good_keywords, bad_keywords, max_pages=args.max_pages, max_depth=args.max_depth)
+        conn.close()
+    elif args.command == "recrawl":
+        from recrawl import recrawl
+        conn = create_connection(args.db)
+        create_tables(conn)
+        good_keywords, bad_keywords = fetch_good_bad_words(args.db)
+        recrawl(conn, good_keywords, bad_keywords, fetch_keyword_expansions(conn), limit=args.limit, workers=args.workers)
+        conn.close()
+    elif args.command == "rescore":
+        conn = create_connection(args.db)
+        create_tables(conn)
+        conn.close()
+        get_reporter().success(f"Re-scored items, {rescore_items(db_path=args.db)} changed")
+
+def build_parser():
+    # Options shared by every command, given after the command name
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--db", default=DB_PATH, help="Path of the SQLite database")
+    common.add_argument("--credentials", help="Service account JSON file, for Sheets and Drive")
+    common.add_argument("--sync", action="store_true", help="Download the database from Drive before the run and upload it after")
+    common.add_argument("--drive-file-id", help="Drive file ID of the database, for --sync")
+    common.add_argument("--verbose", action="store_true")
+
+    parser = argparse.ArgumentParser(description="Run the IIA-DB pipeline without Streamlit.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    def add_sink_arguments(command):
+        command.add_argument("--sink", choices=["db", "sheets"], default="db")
+        command.add_argument("--sheet-id", help="Spreadsheet with the Sure / Not Sure worksheets, for --sink sheets")
+        command.add_argument("--keywords-id", help="Spreadsheet with the Keywords worksheet, for --sink sheets")
+        command.add_argument("--workers", type=int, default=8, help="URLs analyzed concurrently")
+        command.add_argument("--skip-duplicates", action="store_true", help="Don't store near-duplicates of stored items, for --sink db")
+
+    command = commands.add_parser("analyze", parents=[common], help="Analyze the URLs listed in a file")
+    command.add_argument("file", help="One URL per line, '-' for stdin")
+    command.add_argument("--source", default="batch")
+    add_sink_arguments(command)
+
+    command = commands.add_parser("search", parents=[common], help="Search Google for the queries listed in a file and analyze the results")
+    command.add_argument("file", help="One query per line, '-' for stdin")
+    command.add_argument("--num-results", type=int, default=100)
+    command.add_argument("--language", default="en")
+    command.add_argument("--homepage-only", action="store_true")
+    add_sink_arguments(command)
+
+    command = commands.add_parser("domains", parents=[common], help="Split domains into words and write them to the Results sheet")
+    command.add_argument("file", help="One URL per line, '-' for stdin")
+    command.add_argument("--source", default="batch")
+    command.add_argument("--sheet-id", required=True)
+    command.add_argument("--keywords-id", required=True)
+
+    command = commands.add_parser("crawl", parents=[common], help="Discover related sites from the accepted items")
+    command.add_argument("--max-pages", type=int, default=200)
+    command.add_argument("--max-depth", type=int, default=2)
+
+    command = commands.add_parser("recrawl", parents=[common], help="Refresh the archived items that are due, re-analyzing changed pages")
+    command.add_argument("--limit", type=int, default=200, help="Items to check in this run")
+    command.add_argument("--workers", type=int, default=8, help="Items checked concurrently")
+
+    commands.add_parser("rescore", parents=[common], help="Re-score stored items against the current words lists")
+    return parser
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if (args.sync or getattr(args, "sink", "db") == "sheets" or args.command == "domains") and not args.credentials:
+        parser.error("--credentials is required for Sheets and Drive")
+    if getattr(args, "sink", "db") == "sheets" and not (args.sheet_id and args.keywords_id):
+        parser.error("--sheet-id and --keywords-id are required for --sink sheets")
+    if args.sync and not args.drive_file_id:
+        parser.error("--drive-file-id is required for --sync")
+
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    set_reporter(LoggingReporter())
+
+    try:
+        if args.sync:
+            from drive_sync import download_database
+            download_database(drive_service(load_credentials(args.credentials)), args.drive_file_id, args.db)
+        run(args)
+        if args.sync:
+            from drive_sync import upload_database
+            upload_database(drive_service(load_credentials(args.credentials)), args.drive_file_id, args.db)
+            get_reporter().success("Database uploaded to Google Drive")
+    except Exception as e:
+        get_reporter().error(f"Batch run failed: {e}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
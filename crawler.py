@@ -0,0 +1,268 @@
+import re
+import math
+import time
+import heapq
+import hashlib
+from datetime import datetime
+from urllib.parse import urlparse, urljoin
+from urllib import robotparser
+import pytz
+import requests
+from bs4 import BeautifulSoup
+from host_health import fetch, get_host
+from reporting import get_reporter
+from tools import headers, IGNORED_URLS, count_keywords, extract_domain_from_url
+
+
+# Frontier and politeness settings. Sites on the same registrable domain (the blogs of
+# blogspot.com, say) share a server, so requests to them are spaced by HOST_DELAY, or by the
+# Crawl-delay of their robots.txt when it is longer. Sites of a domain that isn't ready yet
+# wait aside while other domains are crawled.
+MAX_DEPTH = 2
+MAX_FRONTIER = 100000
+HOST_DELAY = 2.0
+BATCH_SIZE = 100
+
+# Second-level labels of country code TLDs that are registries rather than domains (co.il, org.uk)
+SECOND_LEVEL_LABELS = {"co", "com", "org", "net", "ac", "gov", "edu", "or", "ne", "muni", "k12"}
+
+# The Bloom filter is sized for this many URLs at BLOOM_ERROR_RATE (about 12 MB)
+BLOOM_CAPACITY = 10000000
+BLOOM_ERROR_RATE = 0.01
+
+
+class BloomFilter:
+    """A fixed-size set of strings with no false negatives and a bounded false positive rate."""
+
+    def __init__(self, capacity=BLOOM_CAPACITY, error_rate=BLOOM_ERROR_RATE):
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], "big"), int.from_bytes(digest[8:], "big") | 1
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+    def add(self, item):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+# Create the crawl table if it doesn't exist
+def ensure_crawl_table(conn):
+    """
+    crawl_urls holds one row per known site, keyed by its canonical URL.
+    status is 'archived' (already an item), 'queued' (waiting in the frontier) or 'fetched'.
+    """
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS crawl_urls (
+            canonical_url TEXT PRIMARY KEY,
+            url TEXT NOT NULL,
+            item_id INTEGER,
+            depth INTEGER NOT NULL DEFAULT 0,
+            priority REAL NOT NULL DEFAULT 0,
+            status TEXT NOT NULL,
+            found_from TEXT,
+            first_seen TEXT
+        )
+    ''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_crawl_urls_item_id ON crawl_urls (item_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_crawl_urls_status ON crawl_urls (status, priority)")
+
+# Function to reduce a URL to the site it belongs to
+def canonical_url(url):
+    if not re.match(r'^https?://', url or ""):
+        url = 'https://' + (url or "")
+    parsed = urlparse(url)
+    host = (parsed.hostname or "").lower().rstrip(".")
+    host = host[4:] if host.startswith("www.") else host
+    if parsed.port and parsed.port not in (80, 443):
+        host = f"{host}:{parsed.port}"
+    return host
+
+# Function to reduce a site to the domain it was registered under, as an approximation of its server
+def registrable_domain(site):
+    host = site.split(":")[0]
+    if re.fullmatch(r'[\d.]+', host):
+        return host
+    labels = host.split(".")
+    if len(labels) >= 3 and len(labels[-1]) == 2 and labels[-2] in SECOND_LEVEL_LABELS:
+        return ".".join(labels[-3:])
+    return ".".join(labels[-2:])
+
+# Function to rank a discovered link in the frontier
+def link_priority(url, anchor_text, good_keywords, bad_keywords, depth):
+    good_count, bad_count = count_keywords(anchor_text, extract_domain_from_url(url), good_keywords, bad_keywords)
+    priority = good_count - bad_count - depth
+    if get_host(url).endswith(".il"):
+        priority += 3
+    if re.search(r'[\u0590-\u05FF]', anchor_text or ""):
+        priority += 3
+    return priority
+
+# Function to extract the outbound links of a page, as (site URL, anchor text) pairs
+def extract_outbound_links(page_url, html):
+    soup = BeautifulSoup(html, 'html.parser')
+    page_site = canonical_url(page_url)
+    links = {}
+    for tag in soup.find_all('a', href=True):
+        link = urljoin(page_url, tag['href'])
+        parsed = urlparse(link)
+        if parsed.scheme not in ("http", "https") or not parsed.netloc:
+            continue
+        site = canonical_url(link)
+        if site and site != page_site and site not in links:
+            links[site] = (f"{parsed.scheme}://{parsed.netloc}", tag.get_text(" ", strip=True))
+    return links
+
+# Function to fetch and parse the robots.txt of a site
+def read_robots(url):
+    """
+    Follows the usual conventions: 401 and 403 disallow everything, other 4xx (no robots.txt)
+    allow everything, and server errors or an unreachable site disallow everything.
+    """
+    robots = robotparser.RobotFileParser()
+    try:
+        response = fetch(urljoin(url, "/robots.txt"), headers=headers)
+    except requests.exceptions.RequestException:
+        robots.disallow_all = True
+        return robots
+    if response.status_code in (401, 403) or response.status_code >= 500:
+        robots.disallow_all = True
+    elif response.status_code >= 400:
+        robots.allow_all = True
+    else:
+        robots.parse(response.text.splitlines())
+    return robots
+
+def _sync_archived_items(conn):
+    # Record items added since the last crawl, so they are never proposed again
+    last_item_id = conn.execute("SELECT COALESCE(MAX(item_id), 0) FROM crawl_urls").fetchone()[0]
+    rows = conn.execute("SELECT id, url FROM items WHERE id > ?", (last_item_id,)).fetchall()
+    conn.executemany('''
+        INSERT OR IGNORE INTO crawl_urls (canonical_url, url, item_id, status)
+        VALUES (?, ?, ?, 'archived')
+    ''', [(canonical_url(url), url, item_id) for item_id, url in rows])
+    conn.commit()
+
+def _flush(conn, candidates, fetched):
+    timestamp = datetime.now(pytz.timezone('Asia/Jerusalem')).strftime("%Y-%m-%d %H:%M:%S")
+    with conn:
+        for site, url, depth, priority, status, found_from, anchor_text in candidates:
+            cursor = conn.execute('''
+                INSERT INTO items (url, decision, decision_reason, source, title, description, title_translated, description_translated, tags, notes, languages)
+                VALUES (?, 'Maybe', 'Found by crawler', ?, '', '', '', '', '', ?, '')
+            ''', (url, f"crawl from '{found_from}' (depth {depth})", f"Link text: {anchor_text}" if anchor_text else ""))
+            conn.execute('''
+                INSERT OR IGNORE INTO crawl_urls (canonical_url, url, item_id, depth, priority, status, found_from, first_seen)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (site, url, cursor.lastrowid, depth, priority, status, found_from, timestamp))
+        conn.executemany("UPDATE crawl_urls SET status = 'fetched' WHERE canonical_url = ?", [(site,) for site in fetched])
+    candidates.clear()
+    fetched.clear()
+
+# Function to discover related sites by following outbound links from accepted items
+def crawl(conn, good_keywords, bad_keywords, max_pages=200, max_depth=MAX_DEPTH, batch_size=BATCH_SIZE, host_delay=HOST_DELAY, max_frontier=MAX_FRONTIER):
+    """
+    Starts from items with decision "Yes", plus sites still queued from earlier runs, and fetches
+    the highest priority sites first. New sites are written to items in batches as "Maybe" candidates.
+
+    :param max_pages: The number of pages to fetch in this run.
+    :param max_depth: How many links away from a seed a site can be and still be crawled.
+    :param host_delay: The minimum time between requests to sites of the same registrable domain, in seconds.
+    :return: A (pages fetched, candidates found) tuple.
+    """
+    ensure_crawl_table(conn)
+    _sync_archived_items(conn)
+
+    # Known sites go in the Bloom filter, positives are confirmed against crawl_urls
+    seen = BloomFilter()
+    for (site,) in conn.execute("SELECT canonical_url FROM crawl_urls"):
+        seen.add(site)
+    ignored = {canonical_url(url) for url in IGNORED_URLS}
+
+    frontier = []
+    order = 0
+    seeds = conn.execute('''
+        SELECT c.canonical_url, c.url, 0, 100 FROM crawl_urls c JOIN items i ON i.id = c.item_id
+        WHERE i.decision = 'Yes' AND c.status != 'fetched'
+        UNION ALL
+        SELECT canonical_url, url, depth, priority FROM (
+            SELECT canonical_url, url, depth, priority FROM crawl_urls WHERE status = 'queued' ORDER BY priority DESC LIMIT ?
+        )
+    ''', (max_frontier,)).fetchall()
+    for site, url, depth, priority in seeds[:max_frontier]:
+        heapq.heappush(frontier, (-priority, order, site, url, depth))
+        order += 1
+
+    robots = {}
+    # Per-domain politeness: when each domain can be requested again, how far apart its requests
+    # must be, and the frontier entries waiting for their domain, by the time it is ready
+    next_allowed, delays, waiting = {}, {}, []
+    # visited holds the sites fetched in this run, pending the new sites not written yet
+    candidates, fetched, visited, pending = [], [], set(), set()
+    pages = found = 0
+    with get_reporter().status("Crawling..."):
+        while (frontier or waiting) and pages < max_pages:
+            now = time.time()
+            while waiting and waiting[0][0] <= now:
+                heapq.heappush(frontier, heapq.heappop(waiting)[1])
+            if not frontier:
+                time.sleep(waiting[0][0] - now)
+                continue
+            entry = heapq.heappop(frontier)
+            _, _, site, url, depth = entry
+            if site in visited:
+                continue
+            domain = registrable_domain(site)
+            if next_allowed.get(domain, 0) > now:
+                heapq.heappush(waiting, (next_allowed[domain], entry))
+                continue
+
+            if site not in robots:
+                robots[site] = read_robots(url)
+                crawl_delay = float(robots[site].crawl_delay(headers["User-Agent"]) or 0)
+                delays[domain] = max(delays.get(domain, host_delay), crawl_delay)
+            fetched.append(site)
+            visited.add(site)
+            if not robots[site].can_fetch(headers["User-Agent"], url):
+                continue
+
+            get_reporter().write(f"Crawling '{url}' (depth {depth})")
+            try:
+                response = fetch(url, headers=headers)
+                pages += 1
+            except requests.exceptions.RequestException as e:
+                get_reporter().write(f"Skipped '{url}': {e}")
+                continue
+            finally:
+                next_allowed[domain] = time.time() + delays[domain]
+            if "html" not in response.headers.get("Content-Type", "html"):
+                continue
+
+            for link_site, (link_url, anchor_text) in extract_outbound_links(url, response.text).items():
+                if link_site in ignored or link_site in pending:
+                    continue
+                if link_site in seen and conn.execute("SELECT 1 FROM crawl_urls WHERE canonical_url = ?", (link_site,)).fetchone():
+                    continue
+                seen.add(link_site)
+                pending.add(link_site)
+                priority = link_priority(link_url, anchor_text, good_keywords, bad_keywords, depth + 1)
+                can_crawl = depth + 1 < max_depth
+                candidates.append((link_site, link_url, depth + 1, priority, "queued" if can_crawl else "archived", url, anchor_text))
+                found += 1
+                # Sites beyond the frontier cap stay queued in crawl_urls for a later run
+                if can_crawl and len(frontier) < max_frontier:
+                    heapq.heappush(frontier, (-priority, order, link_site, link_url, depth + 1))
+                    order += 1
+
+            if len(candidates) >= batch_size:
+                _flush(conn, candidates, fetched)
+                pending.clear()
+        _flush(conn, candidates, fetched)
+    get_reporter().success(f"Crawled {pages} pages and found {found} new sites.")
+    return pages, found
@@ -0,0 +1,102 @@
+import sqlite3
+import pandas as pd
+from tools import calculate_scores, AUTOMATIC_DECISION_SQL
+from facets import ensure_facet_tables, sync_item_facets
+from dedup import ensure_dedup_tables, index_item
+from keywords import ensure_expansions_table, fetch_keyword_expansions
+from recrawl import ensure_fetch_state_table
+from crawler import ensure_crawl_table
+
+
+# Local copy of the database
+DB_PATH = 'iiadb.db'
+
+
+# SQLite3 Database setup
+def create_connection(db_path=DB_PATH):
+    conn = sqlite3.connect(db_path)
+    return conn
+
+# Create the tables if they don't exist
+def create_tables(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS items (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            url TEXT NOT NULL,
+            decision TEXT,
+            decision_reason TEXT,
+            source TEXT,
+            title TEXT,
+            description TEXT,
+            title_translated TEXT,
+            description_translated TEXT,
+            tags TEXT,
+            notes TEXT,
+            languages TEXT
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS words_lists (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            word TEXT NOT NULL,
+            type TEXT NOT NULL CHECK(type IN ('Good', 'Bad'))
+        )
+    ''')
+    ensure_facet_tables(conn)
+    ensure_dedup_tables(conn)
+    ensure_expansions_table(conn)
+    ensure_fetch_state_table(conn)
+    ensure_crawl_table(conn)
+    conn.commit()
+
+# Insert an item with its facets and fingerprint, inside the caller's transaction
+def insert_item(conn, url, decision, decision_reason, source, title, description, title_translated, description_translated, tags, notes, languages):
+    cursor = conn.execute('''
+        INSERT INTO items (url, decision, decision_reason, source, title, description, title_translated, description_translated, tags, notes, languages)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', (url, decision, decision_reason, source, title, description, title_translated, description_translated, tags, notes, languages))
+    sync_item_facets(conn, cursor.lastrowid, languages, tags)
+    index_item(conn, cursor.lastrowid, title, description)
+    return cursor.lastrowid
+
+# Function to fetch good and bad words from the database
+def fetch_good_bad_words(db_path=DB_PATH):
+    conn = create_connection(db_path)
+    cursor = conn.cursor()
+    cursor.execute("SELECT word, type FROM words_lists")
+    words = cursor.fetchall()
+    conn.close()
+
+    good_words = [word[0].lower() for word in words if word[1] == 'Good']
+    bad_words = [word[0].lower() for word in words if word[1] == 'Bad']
+    return good_words, bad_words
+
+# Re-score stored items against the current words lists without refetching pages
+def rescore_items(chunk_size=5000, db_path=DB_PATH):
+    """
+    Re-applies the scoring rules to the automatically scored items, reading the table in chunks.
+    Items marked "No", and items whose decision reason wasn't written by the scorer, were decided
+    by hand and are left alone.
+    Only rows whose decision or decision reason changed are written back, in a single transaction.
+
+    :return: The number of updated items.
+    """
+    good_words, bad_words = fetch_good_bad_words(db_path)
+    conn = create_connection(db_path)
+    try:
+        query = f"""
+            SELECT id, url, decision, decision_reason, title, description,
+                   title_translated, description_translated, languages
+            FROM items WHERE {AUTOMATIC_DECISION_SQL}
+        """
+        keyword_expansions = fetch_keyword_expansions(conn)
+        changes = []
+        for chunk in pd.read_sql_query(query, conn, chunksize=chunk_size):
+            scores = calculate_scores(chunk, good_words, bad_words, keyword_expansions)
+            changed = (scores["decision"] != chunk["decision"]) | (scores["decision_reason"] != chunk["decision_reason"])
+            changes.extend(zip(scores.loc[changed, "decision"].tolist(), scores.loc[changed, "decision_reason"].tolist(), chunk.loc[changed, "id"].astype(int).tolist()))
+        with conn:
+            conn.executemany("UPDATE items SET decision = ?, decision_reason = ? WHERE id = ?", changes)
+        return len(changes)
+    finally:
+        conn.close()
@@ -0,0 +1,180 @@
+import re
+import hashlib
+import unicodedata
+from collections import Counter
+from facets import FACET_TABLES, split_values, sync_item_facets
+
+
+# SimHash fingerprints are split into bands for lookup. Two fingerprints within
+# MAX_DISTANCE bits of each other always share at least one band exactly.
+SIMHASH_BITS = 64
+BANDS = 4
+BAND_BITS = SIMHASH_BITS // BANDS
+MAX_DISTANCE = 3
+SHINGLE_SIZE = 4
+MIN_TEXT_LENGTH = 8
+
+
+# Create the near-duplicate index tables, indexing existing rows the first time
+def ensure_dedup_tables(conn):
+    existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    if "item_simhash" in existing:
+        return
+    conn.execute('''
+        CREATE TABLE item_simhash (
+            item_id INTEGER PRIMARY KEY REFERENCES items(id) ON DELETE CASCADE,
+            simhash INTEGER NOT NULL
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE item_simhash_bands (
+            band INTEGER NOT NULL,
+            value INTEGER NOT NULL,
+            item_id INTEGER NOT NULL,
+            PRIMARY KEY (band, value, item_id)
+        ) WITHOUT ROWID
+    ''')
+    for item_id, title, description in conn.execute("SELECT id, title, description FROM items").fetchall():
+        _insert_fingerprint(conn, item_id, simhash(title, description))
+
+# Function to compute the SimHash of a title and description
+def simhash(title, description):
+    """
+    Fingerprints the character shingles of the normalized title and description.
+
+    :return: A signed 64-bit integer (as stored by SQLite), or None if there is too little text.
+    """
+    if title == "Error":
+        title = ""
+    text = unicodedata.normalize("NFKD", f"{title or ''} {description or ''}".lower())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    text = re.sub(r'[\W_]+', ' ', text).strip()
+    if len(text) < MIN_TEXT_LENGTH:
+        return None
+    shingles = Counter(text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1))
+    weights = [0] * SIMHASH_BITS
+    for shingle, count in shingles.items():
+        hashed = int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(SIMHASH_BITS):
+            weights[bit] += count if hashed >> bit & 1 else -count
+    fingerprint = sum(1 << bit for bit in range(SIMHASH_BITS) if weights[bit] > 0)
+    return fingerprint - (1 << SIMHASH_BITS) if fingerprint >= 1 << (SIMHASH_BITS - 1) else fingerprint
+
+def _bands(fingerprint):
+    unsigned = fingerprint & ((1 << SIMHASH_BITS) - 1)
+    return [(band, unsigned >> (band * BAND_BITS) & ((1 << BAND_BITS) - 1)) for band in range(BANDS)]
+
+def _distance(a, b):
+    return bin((a ^ b) & ((1 << SIMHASH_BITS) - 1)).count("1")
+
+def _insert_fingerprint(conn, item_id, fingerprint):
+    if fingerprint is None:
+        return
+    conn.execute("INSERT INTO item_simhash (item_id, simhash) VALUES (?, ?)", (item_id, fingerprint))
+    conn.executemany(
+        "INSERT INTO item_simhash_bands (band, value, item_id) VALUES (?, ?, ?)",
+        [(band, value, item_id) for band, value in _bands(fingerprint)]
+    )
+
+def _remove_fingerprint(conn, item_id):
+    conn.execute("DELETE FROM item_simhash WHERE item_id = ?", (item_id,))
+    conn.execute("DELETE FROM item_simhash_bands WHERE item_id = ?", (item_id,))
+
+# Update the fingerprint of a single item, inside the caller's transaction.
+# The index tables are created by create_tables, so this stays cheap inside batch loops.
+def index_item(conn, item_id, title, description):
+    _remove_fingerprint(conn, item_id)
+    _insert_fingerprint(conn, item_id, simhash(title, description))
+
+# Function to find stored items that are probable duplicates of a title and description
+def find_duplicates(conn, title, description, exclude_id=None, max_distance=MAX_DISTANCE):
+    """
+    Looks up candidates sharing a SimHash band, then keeps those within max_distance bits.
+
+    :return: A list of (item_id, url, title, distance) tuples, closest first.
+    """
+    fingerprint = simhash(title, description)
+    if fingerprint is None:
+        return []
+    conditions = " OR ".join(["(b.band = ? AND b.value = ?)"] * BANDS)
+    params = [value for band in _bands(fingerprint) for value in band]
+    rows = conn.execute(f'''
+        SELECT DISTINCT i.id, i.url, i.title, s.simhash
+        FROM item_simhash_bands b
+        JOIN item_simhash s ON s.item_id = b.item_id
+        JOIN items i ON i.id = b.item_id
+        WHERE {conditions}
+    ''', params).fetchall()
+    duplicates = [(item_id, url, item_title, _distance(fingerprint, other)) for item_id, url, item_title, other in rows if item_id != exclude_id]
+    return sorted([row for row in duplicates if row[3] <= max_distance], key=lambda row: row[3])
+
+# Function to group all indexed items into clusters of near-duplicates
+def duplicate_clusters(conn, max_distance=MAX_DISTANCE):
+    """
+    :return: A list of clusters, each a sorted list of item ids with more than one member.
+    """
+    # Items with the same fingerprint (parked domains, mirrors) are duplicates outright,
+    # so only distinct fingerprints are compared
+    items_by_fingerprint = {}
+    for item_id, fingerprint in conn.execute("SELECT item_id, simhash FROM item_simhash"):
+        items_by_fingerprint.setdefault(fingerprint, []).append(item_id)
+    parents = {}
+
+    def find(fingerprint):
+        while parents.get(fingerprint, fingerprint) != fingerprint:
+            fingerprint = parents[fingerprint]
+        return fingerprint
+
+    # Only fingerprints sharing a band value are compared
+    buckets = conn.execute('''
+        SELECT GROUP_CONCAT(DISTINCT s.simhash) FROM item_simhash_bands b
+        JOIN item_simhash s ON s.item_id = b.item_id
+        GROUP BY b.band, b.value HAVING COUNT(DISTINCT s.simhash) > 1
+    ''')
+    for (members,) in buckets:
+        members = [int(member) for member in members.split(",")]
+        for i, first in enumerate(members):
+            for second in members[i + 1:]:
+                if find(first) != find(second) and _distance(first, second) <= max_distance:
+                    parents[find(second)] = find(first)
+
+    clusters = {}
+    for fingerprint, item_ids in items_by_fingerprint.items():
+        clusters.setdefault(find(fingerprint), []).extend(item_ids)
+    return sorted(sorted(cluster) for cluster in clusters.values() if len(cluster) > 1)
+
+# Function to merge a cluster of duplicates into a single item
+def merge_cluster(conn, keep_id, duplicate_ids):
+    """
+    Folds the tags of the duplicates into the kept item and deletes them. The kept item keeps
+    its own source, the URLs and other sources of the duplicates are recorded in its notes.
+    Foreign keys aren't enforced, so the rows of every table keyed by item are cleaned up here.
+    Crawled sites of the duplicates are pointed at the kept item, so they stay known.
+    Runs inside the caller's transaction.
+    """
+    duplicate_ids = [item_id for item_id in duplicate_ids if item_id != keep_id]
+    if not duplicate_ids:
+        return
+    placeholders = ", ".join("?" * len(duplicate_ids))
+    keep = conn.execute("SELECT tags, source, notes, languages FROM items WHERE id = ?", (keep_id,)).fetchone()
+    others = conn.execute(f"SELECT url, tags, source FROM items WHERE id IN ({placeholders})", duplicate_ids).fetchall()
+
+    tags = split_values(", ".join([keep[0] or ""] + [row[1] or "" for row in others]))
+    sources = list(dict.fromkeys(row[2] for row in others if row[2] and row[2] != keep[1]))
+    merged = ["Merged duplicates: " + ", ".join(row[0] for row in others)]
+    if sources:
+        merged.append("Merged sources: " + "; ".join(sources))
+    notes = "\n".join(note for note in [keep[2]] + merged if note)
+    conn.execute(
+        "UPDATE items SET tags = ?, notes = ? WHERE id = ?",
+        (", ".join(tags), notes, keep_id)
+    )
+    sync_item_facets(conn, keep_id, keep[3], ", ".join(tags))
+
+    for item_id in duplicate_ids:
+        _remove_fingerprint(conn, item_id)
+    for table, _ in FACET_TABLES.values():
+        conn.execute(f"DELETE FROM {table} WHERE item_id IN ({placeholders})", duplicate_ids)
+    conn.execute(f"DELETE FROM item_fetch_state WHERE item_id IN ({placeholders})", duplicate_ids)
+    conn.execute(f"UPDATE crawl_urls SET item_id = ? WHERE item_id IN ({placeholders})", [keep_id] + duplicate_ids)
+    conn.execute(f"DELETE FROM items WHERE id IN ({placeholders})", duplicate_ids)
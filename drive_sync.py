@@ -0,0 +1,183 @@
+import os
+import gzip
+import hashlib
+import sqlite3
+import tempfile
+from googleapiclient.http import MediaIoBaseDownload, MediaFileUpload
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+# Resumable transfers go in chunks of this size (a multiple of 256 KB, as Drive requires)
+CHUNK_SIZE = 8 * 1024 * 1024
+NUM_RETRIES = 5
+READ_SIZE = 1024 * 1024
+
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+SQLITE_MAGIC = b"SQLite format 3\x00"
+
+ZSTD_MIMETYPE = "application/zstd"
+GZIP_MIMETYPE = "application/gzip"
+SQLITE_MIMETYPE = "application/x-sqlite3"
+
+
+class IntegrityError(Exception):
+    """Raised when a downloaded database does not match its checksum or fails SQLite's check."""
+
+
+# Function to take a consistent copy of a live SQLite database
+def snapshot_database(db_path, snapshot_path):
+    source = sqlite3.connect(db_path)
+    target = sqlite3.connect(snapshot_path)
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+
+# Function to compress a file with zstd, or gzip when zstandard isn't installed
+def compress_file(path, compressed_path):
+    """
+    :return: A (mimetype, sha256 of the uncompressed file) tuple.
+    """
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as source, open(compressed_path, "wb") as target:
+        if zstandard:
+            mimetype = ZSTD_MIMETYPE
+            writer = zstandard.ZstdCompressor(level=10, threads=-1).stream_writer(target, closefd=False)
+        else:
+            mimetype = GZIP_MIMETYPE
+            writer = gzip.GzipFile(fileobj=target, mode="wb", compresslevel=6)
+        with writer:
+            for block in iter(lambda: source.read(READ_SIZE), b""):
+                sha256.update(block)
+                writer.write(block)
+    return mimetype, sha256.hexdigest()
+
+# Function to tell the format of a downloaded snapshot from its magic bytes
+def detect_encoding(path):
+    """
+    :return: The mimetype of the file, or None if it is neither compressed nor a SQLite database.
+    """
+    with open(path, "rb") as file:
+        magic = file.read(len(SQLITE_MAGIC))
+    if magic.startswith(ZSTD_MAGIC):
+        return ZSTD_MIMETYPE
+    if magic.startswith(GZIP_MAGIC):
+        return GZIP_MIMETYPE
+    if magic == SQLITE_MAGIC:
+        return SQLITE_MIMETYPE
+    return None
+
+# Function to decompress a downloaded snapshot, whatever format it was uploaded in
+def decompress_file(compressed_path, path):
+    """
+    Raw SQLite files, uploaded before compression was introduced or by older clients, are copied as they are.
+
+    :return: The sha256 of the decompressed file.
+    """
+    encoding = detect_encoding(compressed_path)
+    with open(compressed_path, "rb") as source:
+        if encoding == ZSTD_MIMETYPE:
+            if not zstandard:
+                raise ImportError("The database on Drive is zstd compressed, install zstandard to read it")
+            reader = zstandard.ZstdDecompressor().stream_reader(source)
+        elif encoding == GZIP_MIMETYPE:
+            reader = gzip.GzipFile(fileobj=source, mode="rb")
+        elif encoding == SQLITE_MIMETYPE:
+            reader = source
+        else:
+            raise IntegrityError("The downloaded file is not a SQLite database")
+        sha256 = hashlib.sha256()
+        with open(path, "wb") as target:
+            for block in iter(lambda: reader.read(READ_SIZE), b""):
+                sha256.update(block)
+                target.write(block)
+    return sha256.hexdigest()
+
+# Function to compute the md5 of a file, as Drive reports it in md5Checksum
+def file_md5(path):
+    md5 = hashlib.md5()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(READ_SIZE), b""):
+            md5.update(block)
+    return md5.hexdigest()
+
+# Function to pick the checksum a downloaded database must match
+def expected_checksum(metadata, encoding):
+    """
+    Other clients can replace the file on Drive without touching its appProperties, so the stored
+    sha256 only applies while the file is still the upload it was computed for: Drive's md5Checksum
+    matches the stored md5, or, for uploads that didn't store one, the stored encoding matches the file.
+
+    :param metadata: The file's Drive metadata, with md5Checksum and appProperties.
+    :param encoding: The encoding detected from the downloaded file.
+    :return: The expected sha256, or None if there is nothing to check against.
+    """
+    properties = metadata.get("appProperties") or {}
+    if properties.get("md5"):
+        current = properties["md5"] == metadata.get("md5Checksum")
+    else:
+        current = properties.get("encoding") == encoding
+    return properties.get("sha256") if current else None
+
+# Function to upload a compressed snapshot of the database as a resumable, chunked transfer
+def upload_database(service, file_id, db_path, chunk_size=CHUNK_SIZE, progress=None):
+    """
+    :param progress: Optional callback, called with the fraction uploaded after each chunk.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        snapshot_path = os.path.join(directory, "snapshot.db")
+        compressed_path = os.path.join(directory, "snapshot.db.z")
+        snapshot_database(db_path, snapshot_path)
+        mimetype, sha256 = compress_file(snapshot_path, compressed_path)
+
+        media = MediaFileUpload(compressed_path, mimetype=mimetype, chunksize=chunk_size, resumable=True)
+        body = {"appProperties": {"sha256": sha256, "md5": file_md5(compressed_path), "encoding": mimetype}}
+        request = service.files().update(fileId=file_id, body=body, media_body=media)
+        response = None
+        # next_chunk resumes from the last byte Drive acknowledged when a chunk fails
+        while response is None:
+            status, response = request.next_chunk(num_retries=NUM_RETRIES)
+            if status and progress:
+                progress(status.progress())
+        return response
+
+# Function to download, decompress and verify the database
+def download_database(service, file_id, db_path, chunk_size=CHUNK_SIZE, progress=None):
+    """
+    The database is downloaded to a temporary file and only replaces db_path once its
+    checksum and SQLite's quick_check pass. Files replaced by other clients since the last
+    upload from here have no checksum to match and only get the quick_check.
+
+    :raises IntegrityError: If the download is corrupt.
+    """
+    metadata = service.files().get(fileId=file_id, fields="md5Checksum, appProperties").execute()
+    directory = os.path.dirname(os.path.abspath(db_path))
+    with tempfile.TemporaryDirectory(dir=directory) as temporary:
+        compressed_path = os.path.join(temporary, "download.db.z")
+        database_path = os.path.join(temporary, "download.db")
+        with open(compressed_path, "wb") as file:
+            downloader = MediaIoBaseDownload(file, service.files().get_media(fileId=file_id), chunksize=chunk_size)
+            done = False
+            while not done:
+                status, done = downloader.next_chunk(num_retries=NUM_RETRIES)
+                if progress:
+                    progress(status.progress())
+
+        expected_sha256 = expected_checksum(metadata, detect_encoding(compressed_path))
+        sha256 = decompress_file(compressed_path, database_path)
+        if expected_sha256 and sha256 != expected_sha256:
+            raise IntegrityError("The downloaded database does not match its checksum")
+        conn = sqlite3.connect(database_path)
+        try:
+            result = conn.execute("PRAGMA quick_check").fetchone()[0]
+        finally:
+            conn.close()
+        if result != "ok":
+            raise IntegrityError(f"The downloaded database failed its integrity check: {result}")
+        os.replace(database_path, db_path)
@@ -0,0 +1,61 @@
+import pandas as pd
+from export import ITEM_COLUMNS
+from facets import sync_item_facets
+from dedup import index_item
+from tools import MANUAL_REASON
+
+
+# Column labels of the items table, as shown in the app
+ITEM_LABELS = [
+    "ID", "URL", "Decision", "Decision Reason", "Source", "Title", 
+    "Description", "Title Translated", "Description Translated", 
+    "Tags", "Notes", "Languages"
+]
+
+
+# Function to compare an edited grid with the rows it was built from
+def diff_rows(original, edited, key="ID"):
+    """
+    :return: A tuple of (new rows DataFrame, {id: {column: new value}} for changed cells, list of deleted ids).
+    """
+    inserted = edited[edited[key].isna()].drop(columns=[key])
+    before = original.set_index(key)
+    after = edited[edited[key].notna()].astype({key: int}).set_index(key)
+    deleted = [int(item_id) for item_id in before.index.difference(after.index)]
+    common = before.index.intersection(after.index)
+    before, after = before.loc[common].fillna(""), after.loc[common, before.columns]
+    changed = before.astype(str) != after.fillna("").astype(str)
+    changes = {}
+    for item_id, column in zip(*changed.to_numpy().nonzero()):
+        changes.setdefault(int(common[item_id]), {})[before.columns[column]] = after.iat[item_id, column]
+    return inserted, changes, deleted
+
+# Function to write the changed cells of edited items in a single transaction
+def save_item_changes(conn, edited, changes):
+    """
+    Applies one executemany per changed column, then refreshes the facets and
+    near-duplicate index of the affected items.
+
+    :param edited: The edited items DataFrame, with ITEM_LABELS columns.
+    :param changes: The {id: {label: value}} cells returned by diff_rows.
+    """
+    # A decision changed without a new reason is marked as manual, so re-scoring leaves it alone
+    changes = {item_id: dict(cells) for item_id, cells in changes.items()}
+    for cells in changes.values():
+        if "Decision" in cells and "Decision Reason" not in cells:
+            cells["Decision Reason"] = MANUAL_REASON
+    columns = dict(zip(ITEM_LABELS, ITEM_COLUMNS))
+    by_column = {}
+    for item_id, cells in changes.items():
+        for label, value in cells.items():
+            by_column.setdefault(label, []).append((None if pd.isna(value) else value, item_id))
+    rows = edited.set_index("ID")
+    with conn:
+        for label, params in by_column.items():
+            conn.executemany(f"UPDATE items SET {columns[label]} = ? WHERE id = ?", params)
+        for item_id, cells in changes.items():
+            row = rows.loc[item_id]
+            if {"Languages", "Tags"} & cells.keys():
+                sync_item_facets(conn, item_id, row["Languages"], row["Tags"])
+            if {"Title", "Description"} & cells.keys():
+                index_item(conn, item_id, row["Title"], row["Description"])
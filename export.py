@@ -0,0 +1,76 @@
+import csv
+
+
+# Columns of the items table, in export order
+ITEM_COLUMNS = [
+    "id", "url", "decision", "decision_reason", "source", "title",
+    "description", "title_translated", "description_translated",
+    "tags", "notes", "languages"
+]
+
+# Supported export formats and their file extensions
+EXPORT_FORMATS = {"CSV": ".csv", "XLSX": ".xlsx", "Parquet": ".parquet"}
+
+
+# Function to read matching items in fixed-size chunks
+def iter_item_chunks(conn, where="1 = 1", params=(), chunk_size=5000):
+    cursor = conn.execute(f"SELECT {', '.join(ITEM_COLUMNS)} FROM items WHERE {where} ORDER BY items.id", params)
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            break
+        yield rows
+
+def _export_csv(chunks, path):
+    count = 0
+    with open(path, "w", newline="", encoding="utf-8") as file:
+        writer = csv.writer(file)
+        writer.writerow(ITEM_COLUMNS)
+        for rows in chunks:
+            writer.writerows(rows)
+            count += len(rows)
+    return count
+
+def _export_xlsx(chunks, path):
+    from openpyxl import Workbook
+    from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+
+    # Write-only workbooks stream rows to disk instead of keeping them in memory
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("items")
+    sheet.append(ITEM_COLUMNS)
+    count = 0
+    for rows in chunks:
+        for row in rows:
+            sheet.append([ILLEGAL_CHARACTERS_RE.sub("", value) if isinstance(value, str) else value for value in row])
+        count += len(rows)
+    workbook.save(path)
+    return count
+
+def _export_parquet(chunks, path):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([("id", pa.int64())] + [(column, pa.string()) for column in ITEM_COLUMNS[1:]])
+    count = 0
+    with pq.ParquetWriter(path, schema, compression="zstd") as writer:
+        for rows in chunks:
+            columns = list(zip(*rows))
+            writer.write_table(pa.Table.from_arrays([pa.array(values, type=field.type) for values, field in zip(columns, schema)], schema=schema))
+            count += len(rows)
+    return count
+
+# Function to stream items to a CSV, XLSX or Parquet file
+def export_items(conn, path, file_format, where="1 = 1", params=(), chunk_size=5000):
+    """
+    Streams the items matching a filter to a file, one chunk at a time, so memory use
+    does not grow with the size of the archive.
+
+    :param file_format: One of the EXPORT_FORMATS keys.
+    :param where: A WHERE clause on items, with its params (e.g. from facet_conditions).
+    :return: The number of exported items.
+    """
+    writers = {"CSV": _export_csv, "XLSX": _export_xlsx, "Parquet": _export_parquet}
+    if file_format not in writers:
+        raise ValueError(f"Unsupported export format '{file_format}'")
+    return writers[file_format](iter_item_chunks(conn, where, params, chunk_size), path)
@@ -0,0 +1,111 @@
+# Languages and tags are stored on items as comma separated strings.
+# They are mirrored into junction tables so they can be filtered and counted with indexes.
+FACET_TABLES = {
+    "languages": ("item_languages", "language"),
+    "tags": ("item_tags", "tag"),
+}
+
+
+# Function to split a comma separated field into normalized facet values
+def split_values(text):
+    values = []
+    for value in (text or "").split(","):
+        value = value.strip().lower()
+        if value and value not in values:
+            values.append(value)
+    return values
+
+# Create the facet tables and indexes, migrating existing rows the first time
+def ensure_facet_tables(conn):
+    existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    created = False
+    for table, column in FACET_TABLES.values():
+        if table not in existing:
+            conn.execute(f'''
+                CREATE TABLE {table} (
+                    item_id INTEGER NOT NULL REFERENCES items(id) ON DELETE CASCADE,
+                    {column} TEXT NOT NULL,
+                    PRIMARY KEY (item_id, {column})
+                ) WITHOUT ROWID
+            ''')
+            conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_{column} ON {table} ({column}, item_id)")
+            created = True
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_items_decision ON items (decision)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_items_source ON items (source)")
+    if created:
+        rebuild_facets(conn)
+
+# Rebuild the facet tables from the comma separated columns of all items
+def rebuild_facets(conn):
+    for table, _ in FACET_TABLES.values():
+        conn.execute(f"DELETE FROM {table}")
+    rows = conn.execute("SELECT id, languages, tags FROM items").fetchall()
+    for field, (table, column) in FACET_TABLES.items():
+        index = 1 if field == "languages" else 2
+        conn.executemany(
+            f"INSERT INTO {table} (item_id, {column}) VALUES (?, ?)",
+            [(row[0], value) for row in rows for value in split_values(row[index])]
+        )
+
+# Replace the facet values of a single item, inside the caller's transaction.
+# The facet tables are created by create_tables, so this stays cheap inside batch loops.
+def sync_item_facets(conn, item_id, languages, tags):
+    for field, text in (("languages", languages), ("tags", tags)):
+        table, column = FACET_TABLES[field]
+        conn.execute(f"DELETE FROM {table} WHERE item_id = ?", (item_id,))
+        conn.executemany(
+            f"INSERT INTO {table} (item_id, {column}) VALUES (?, ?)",
+            [(item_id, value) for value in split_values(text)]
+        )
+
+# Build the WHERE clause for a faceted filter
+def facet_conditions(decisions=(), sources=(), languages=(), tags=()):
+    """
+    Decisions and sources match any of the given values, languages and tags must all be present.
+
+    :return: A (where_clause, params) tuple for a query on items.
+    """
+    conditions = []
+    params = []
+    if decisions:
+        conditions.append(f"items.decision IN ({', '.join('?' * len(decisions))})")
+        params.extend(decisions)
+    if sources:
+        conditions.append(f"items.source IN ({', '.join('?' * len(sources))})")
+        params.extend(sources)
+    for field, values in (("languages", languages), ("tags", tags)):
+        table, column = FACET_TABLES[field]
+        values = [value.strip().lower() for value in values]
+        if values:
+            subqueries = " INTERSECT ".join([f"SELECT item_id FROM {table} WHERE {column} = ?"] * len(values))
+            conditions.append(f"items.id IN ({subqueries})")
+            params.extend(values)
+    return (" AND ".join(conditions) or "1 = 1"), params
+
+# Fetch the items matching a faceted filter
+def filter_items(conn, decisions=(), sources=(), languages=(), tags=(), limit=None):
+    where, params = facet_conditions(decisions, sources, languages, tags)
+    query = f"SELECT * FROM items WHERE {where} ORDER BY items.id"
+    if limit:
+        query += " LIMIT ?"
+        params.append(limit)
+    return conn.execute(query, params).fetchall()
+
+# Count the items per facet value within a faceted filter
+def facet_counts(conn, decisions=(), sources=(), languages=(), tags=()):
+    """
+    :return: A dict mapping each facet (decision, source, languages, tags) to {value: count}, largest first.
+    """
+    where, params = facet_conditions(decisions, sources, languages, tags)
+    matching = f"SELECT items.id FROM items WHERE {where}"
+    queries = {
+        "decision": f"SELECT decision, COUNT(*) FROM items WHERE id IN ({matching}) GROUP BY decision",
+        "source": f"SELECT source, COUNT(*) FROM items WHERE id IN ({matching}) GROUP BY source",
+    }
+    for field, (table, column) in FACET_TABLES.items():
+        queries[field] = f"SELECT {column}, COUNT(*) FROM {table} WHERE item_id IN ({matching}) GROUP BY {column}"
+    counts = {}
+    for facet, query in queries.items():
+        rows = conn.execute(query, params).fetchall()
+        counts[facet] = {value: count for value, count in sorted(rows, key=lambda row: -row[1]) if value}
+    return counts
@@ -0,0 +1,171 @@
+import sqlite3
+import time
+import random
+import threading
+from urllib.parse import urlparse
+import requests
+
+
+# Persistent registry of host failures, shared across runs
+HOST_HEALTH_DB = 'host_health.db'
+
+# Separate connect and read timeouts, in seconds
+CONNECT_TIMEOUT = 10
+READ_TIMEOUT = 30
+
+# Retries for transient failures, with capped exponential backoff
+MAX_RETRIES = 2
+BACKOFF_BASE = 1
+BACKOFF_CAP = 16
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Errors caused by the request itself rather than the host. They are raised right away,
+# without retries, and don't count against the host.
+REQUEST_ERRORS = (
+    requests.exceptions.InvalidURL,
+    requests.exceptions.MissingSchema,
+    requests.exceptions.InvalidSchema,
+    requests.exceptions.URLRequired,
+    requests.exceptions.InvalidHeader,
+    requests.exceptions.TooManyRedirects,
+)
+
+# A host is only skipped after this many consecutive failed requests, so a short outage
+# on our side (resolver, network) doesn't block every host it touched
+FAILURE_THRESHOLD = 3
+
+# How long a host is skipped once it reaches FAILURE_THRESHOLD, by failure kind.
+# Every further failure doubles the time, up to MAX_BLOCK.
+NEGATIVE_TTL = {
+    "dns": 24 * 3600,
+    "connect": 3600,
+    "ssl": 3600,
+    "timeout": 600,
+    "server": 600,
+    "error": 600,
+}
+MAX_BLOCK = 7 * 24 * 3600
+
+_lock = threading.Lock()
+
+
+class HostUnavailableError(requests.exceptions.RequestException):
+    """Raised when a host is known to be dead and the request is short-circuited."""
+
+
+def _connect():
+    conn = sqlite3.connect(HOST_HEALTH_DB, timeout=30)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS host_health (
+            host TEXT PRIMARY KEY,
+            failures INTEGER NOT NULL DEFAULT 0,
+            last_error TEXT,
+            last_failure REAL,
+            blocked_until REAL NOT NULL DEFAULT 0
+        )
+    ''')
+    return conn
+
+# Function to get the host of a URL, without the www. prefix
+def get_host(url):
+    host = urlparse(url).netloc.lower()
+    return host[4:] if host.startswith("www.") else host
+
+# Function to look up the failure record of a host
+def _host_row(host):
+    with _lock:
+        conn = _connect()
+        try:
+            return conn.execute("SELECT last_error, blocked_until FROM host_health WHERE host = ?", (host,)).fetchone()
+        finally:
+            conn.close()
+
+# Function to check whether a host is currently short-circuited
+def is_host_blocked(host):
+    """
+    :return: A (blocked, reason) tuple for the host.
+    """
+    row = _host_row(host)
+    if row and row[1] > time.time():
+        return True, row[0]
+    return False, None
+
+# Function to reset the failure counter of a host after a successful request
+def record_host_success(host):
+    with _lock:
+        conn = _connect()
+        try:
+            with conn:
+                conn.execute("DELETE FROM host_health WHERE host = ?", (host,))
+        finally:
+            conn.close()
+
+# Function to count a failure, opening the circuit for the host at FAILURE_THRESHOLD
+def record_host_failure(host, kind, error_message):
+    with _lock:
+        conn = _connect()
+        try:
+            with conn:
+                row = conn.execute("SELECT failures FROM host_health WHERE host = ?", (host,)).fetchone()
+                failures = (row[0] if row else 0) + 1
+                now = time.time()
+                block = 0
+                if failures >= FAILURE_THRESHOLD:
+                    block = min(NEGATIVE_TTL.get(kind, NEGATIVE_TTL["error"]) * 2 ** (failures - FAILURE_THRESHOLD), MAX_BLOCK)
+                conn.execute('''
+                    INSERT OR REPLACE INTO host_health (host, failures, last_error, last_failure, blocked_until)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', (host, failures, f"{kind}: {error_message}", now, now + block))
+        finally:
+            conn.close()
+
+# Function to sort a request error into a failure kind
+def classify_error(error):
+    if isinstance(error, requests.exceptions.SSLError):
+        return "ssl"
+    if isinstance(error, (requests.exceptions.ConnectTimeout, requests.exceptions.ReadTimeout)):
+        return "timeout"
+    if isinstance(error, requests.exceptions.ConnectionError):
+        message = str(error)
+        if any(marker in message for marker in ("NameResolutionError", "Name or service not known", "getaddrinfo failed", "nodename nor servname", "No address associated")):
+            return "dns"
+        return "connect"
+    return "error"
+
+# Function to fetch a URL through the host health registry
+def fetch(url, **kwargs):
+    """
+    Fetches a URL, skipping hosts that recently failed and retrying transient errors with backoff.
+    DNS failures and refused connections are not retried, they count towards blocking the host right away.
+    Invalid URLs and redirect loops are raised as they are, without blocking the host.
+
+    :raises HostUnavailableError: If the host is currently blocked.
+    :raises requests.exceptions.RequestException: If the request failed after all retries.
+    """
+    host = get_host(url)
+    # Hosts without a row have no failures to reset, so most successes write nothing
+    row = _host_row(host)
+    if row and row[1] > time.time():
+        raise HostUnavailableError(f"Skipping known dead host '{host}' ({row[0]})")
+
+    kwargs.setdefault("timeout", (CONNECT_TIMEOUT, READ_TIMEOUT))
+    for attempt in range(MAX_RETRIES + 1):
+        try:
+            response = requests.get(url, **kwargs)
+        except REQUEST_ERRORS:
+            raise
+        except requests.exceptions.RequestException as e:
+            kind = classify_error(e)
+            if kind in ("timeout", "error") and attempt < MAX_RETRIES:
+                time.sleep(min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt) * random.uniform(0.5, 1))
+                continue
+            record_host_failure(host, kind, e)
+            raise
+        if response.status_code in RETRY_STATUS_CODES and attempt < MAX_RETRIES:
+            time.sleep(min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt) * random.uniform(0.5, 1))
+            continue
+        if response.status_code >= 500:
+            record_host_failure(host, "server", f"HTTP {response.status_code}")
+        elif row:
+            record_host_success(host)
+        return response
@@ -0,0 +1,77 @@
+from datetime import datetime
+import pytz
+from tools import translate_from_english
+
+
+# Languages the words lists are expanded into, by CLD2 language name, with their translation codes.
+# Hebrew pages are always accepted, so Hebrew needs no expansion.
+EXPANSION_LANGUAGES = {
+    "spanish": "es",
+    "portuguese": "pt",
+    "french": "fr",
+    "italian": "it",
+    "german": "de",
+    "russian": "ru",
+}
+TRANSLATION_PROVIDER = "googletrans"
+
+
+# Create the keyword expansions table if it doesn't exist
+def ensure_expansions_table(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS words_expansions (
+            word TEXT NOT NULL,
+            type TEXT NOT NULL,
+            language TEXT NOT NULL,
+            expansion TEXT NOT NULL,
+            provider TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            PRIMARY KEY (word, type, language)
+        )
+    ''')
+
+# Function to translate the words lists into every expansion language
+def refresh_keyword_expansions(conn, languages=EXPANSION_LANGUAGES):
+    """
+    Only words without an expansion for a language are translated, so unchanged lists cost nothing.
+    Expansions of words that were removed from the lists are dropped.
+    Keywords are matched as single words, so translations into several words are stored empty,
+    which records that the word was translated without ever matching.
+
+    :return: The number of new expansions.
+    """
+    ensure_expansions_table(conn)
+    words = set(conn.execute("SELECT lower(trim(word)), type FROM words_lists WHERE trim(word) != ''").fetchall())
+    existing = {(word, word_type, language) for word, word_type, language in conn.execute("SELECT word, type, language FROM words_expansions")}
+    timestamp = datetime.now(pytz.timezone('Asia/Jerusalem')).strftime("%Y-%m-%d %H:%M:%S")
+
+    expansions = []
+    for word, word_type in words:
+        for language, code in languages.items():
+            if (word, word_type, language) in existing:
+                continue
+            expansion = translate_from_english(word, code)
+            if expansion:
+                expansion = expansion.strip().lower()
+                expansions.append((word, word_type, language, "" if len(expansion.split()) > 1 else expansion, TRANSLATION_PROVIDER, timestamp))
+
+    stale = [key for key in existing if key[:2] not in words or key[2] not in languages]
+    with conn:
+        conn.executemany("DELETE FROM words_expansions WHERE word = ? AND type = ? AND language = ?", stale)
+        conn.executemany('''
+            INSERT OR REPLACE INTO words_expansions (word, type, language, expansion, provider, created_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', expansions)
+    return len(expansions)
+
+# Function to fetch the keyword expansions of every language
+def fetch_keyword_expansions(conn):
+    """
+    :return: A dict mapping a language to its (good, bad) translated keywords.
+    """
+    ensure_expansions_table(conn)
+    expansions = {}
+    for language, word_type, expansion in conn.execute("SELECT language, type, expansion FROM words_expansions WHERE expansion != ''"):
+        good, bad = expansions.setdefault(language, ([], []))
+        (good if word_type == "Good" else bad).append(expansion)
+    return expansions
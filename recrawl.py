@@ -0,0 +1,163 @@
+import re
+import time
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from bs4 import BeautifulSoup
+from host_health import fetch
+from reporting import get_reporter
+from tools import headers, extract_title, extract_description, analyze_page, AUTOMATIC_DECISION_SQL
+from facets import sync_item_facets
+from dedup import index_item
+
+
+# Revisit intervals, in seconds. An item's interval halves when its page changed
+# and doubles when it didn't, so volatile sites are checked more often.
+DAY = 24 * 3600
+INITIAL_INTERVAL = 7 * DAY
+MIN_INTERVAL = DAY
+MAX_INTERVAL = 90 * DAY
+# Hosts that are down are retried after this long
+FAILURE_INTERVAL = 3 * DAY
+BATCH_SIZE = 50
+
+
+# Create the fetch state table if it doesn't exist
+def ensure_fetch_state_table(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS item_fetch_state (
+            item_id INTEGER PRIMARY KEY REFERENCES items(id) ON DELETE CASCADE,
+            etag TEXT,
+            last_modified TEXT,
+            content_hash TEXT,
+            last_checked REAL,
+            last_changed REAL,
+            check_count INTEGER NOT NULL DEFAULT 0,
+            change_count INTEGER NOT NULL DEFAULT 0,
+            interval REAL NOT NULL DEFAULT 0,
+            next_check REAL NOT NULL DEFAULT 0
+        )
+    ''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_item_fetch_state_next_check ON item_fetch_state (next_check)")
+
+# Function to hash the parts of a page that analysis depends on
+def content_hash(title, description):
+    return hashlib.sha256(f"{title or ''}\n{description or ''}".encode("utf-8")).hexdigest()
+
+# Function to select the items that are due for a check, never checked ones first
+def due_items(conn, limit, now=None):
+    now = now or time.time()
+    return conn.execute('''
+        SELECT i.id, i.url, i.title, i.description, s.etag, s.last_modified, s.content_hash, s.interval
+        FROM items i LEFT JOIN item_fetch_state s ON s.item_id = i.id
+        WHERE (i.decision IS NULL OR i.decision != 'No') AND (s.item_id IS NULL OR s.next_check <= ?)
+        ORDER BY s.item_id IS NOT NULL, s.next_check
+        LIMIT ?
+    ''', (now, limit)).fetchall()
+
+# Function to fetch an item's page with a conditional GET
+def check_item(item):
+    """
+    Runs on worker threads, so it doesn't report anything itself.
+
+    :return: A (status, title, description, etag, last_modified) tuple, where status is
+             "unchanged" for a 304, "fetched" for a new copy of the page, or "failed".
+             For failures, title holds the error message.
+    """
+    item_id, url, _, _, etag, last_modified, _, _ = item
+    if not re.match(r'^https?://', url):
+        url = 'https://' + url
+    # no-store makes the local HTTP cache pass the conditional GET through to the site
+    conditional_headers = dict(headers)
+    conditional_headers["Cache-Control"] = "no-store"
+    if etag:
+        conditional_headers["If-None-Match"] = etag
+    if last_modified:
+        conditional_headers["If-Modified-Since"] = last_modified
+    try:
+        response = fetch(url, headers=conditional_headers)
+    except requests.exceptions.RequestException as e:
+        return "failed", str(e), None, etag, last_modified
+    if response.status_code == 304:
+        return "unchanged", None, None, etag, last_modified
+    if response.status_code >= 400:
+        return "failed", f"HTTP {response.status_code}", None, etag, last_modified
+    response.encoding = 'utf-8'
+    soup = BeautifulSoup(response.text, 'html.parser')
+    return "fetched", extract_title(soup), extract_description(soup), response.headers.get("ETag"), response.headers.get("Last-Modified")
+
+# Function to refresh the items that are due, re-analyzing only pages whose content changed
+def recrawl(conn, good_keywords, bad_keywords, keyword_expansions=None, limit=200, workers=8):
+    """
+    Pages that answer 304, or whose title and description hash is unchanged, only have their
+    schedule updated. Changed pages get language detection and scoring again, and their items,
+    facets and fingerprints are updated in batched transactions. Decisions made by hand are kept.
+
+    :return: A (checked, changed) tuple.
+    """
+    ensure_fetch_state_table(conn)
+    items = due_items(conn, limit)
+    checked = changed = 0
+    updates = []
+    with ThreadPoolExecutor(max_workers=workers) as pool, get_reporter().status("Recrawling..."):
+        for item, result in zip(items, pool.map(check_item, items)):
+            item_id, url, stored_title, stored_description, _, _, stored_hash, interval = item
+            status, title, description, etag, last_modified = result
+            now = time.time()
+            checked += 1
+            # Items checked for the first time are compared with what is stored
+            stored_hash = stored_hash or content_hash(stored_title, stored_description)
+            interval = interval or INITIAL_INTERVAL
+            page_changed = status == "fetched" and content_hash(title, description) != stored_hash
+            if status == "failed":
+                get_reporter().write(f"Could not check '{url}': {title}")
+                next_interval, delay = interval, FAILURE_INTERVAL
+            elif page_changed:
+                next_interval = delay = max(MIN_INTERVAL, interval / 2)
+            else:
+                next_interval = delay = min(MAX_INTERVAL, interval * 2)
+
+            analysis = None
+            if page_changed:
+                changed += 1
+                get_reporter().write(f"'{url}' changed, re-analyzing")
+                analysis = analyze_page(url, title, description, good_keywords, bad_keywords, keyword_expansions)
+                # A failed analysis keeps the old hash and validators, so the next check
+                # fetches the page again instead of getting a 304, and analyzes it again
+                if analysis[5] != "Error":
+                    stored_hash = content_hash(title, description)
+                else:
+                    etag, last_modified = item[4], item[5]
+            updates.append((item_id, page_changed, analysis, etag, last_modified, stored_hash, now, next_interval, delay))
+            if len(updates) >= BATCH_SIZE:
+                _write_updates(conn, updates)
+        _write_updates(conn, updates)
+    get_reporter().success(f"Checked {checked} items, {changed} changed.")
+    return checked, changed
+
+def _write_updates(conn, updates):
+    with conn:
+        for item_id, page_changed, analysis, etag, last_modified, stored_hash, now, next_interval, delay in updates:
+            conn.execute('''
+                INSERT INTO item_fetch_state (item_id, etag, last_modified, content_hash, last_checked, last_changed, check_count, change_count, interval, next_check)
+                VALUES (?, ?, ?, ?, ?, ?, 1, ?, ?, ?)
+                ON CONFLICT(item_id) DO UPDATE SET
+                    etag = excluded.etag, last_modified = excluded.last_modified, content_hash = excluded.content_hash,
+                    last_checked = excluded.last_checked, last_changed = COALESCE(excluded.last_changed, last_changed),
+                    check_count = check_count + 1, change_count = change_count + excluded.change_count,
+                    interval = excluded.interval, next_check = excluded.next_check
+            ''', (item_id, etag, last_modified, stored_hash, now, now if page_changed else None, int(page_changed), next_interval, now + delay))
+            if not analysis or analysis[5] == "Error":
+                continue
+            title, description, translated_title, translated_description, languages, decision, details = analysis
+            languages = ", ".join(languages)
+            conn.execute(f'''
+                UPDATE items SET title = ?, description = ?, title_translated = ?, description_translated = ?, languages = ?,
+                    decision = CASE WHEN {AUTOMATIC_DECISION_SQL} THEN ? ELSE decision END,
+                    decision_reason = CASE WHEN {AUTOMATIC_DECISION_SQL} THEN ? ELSE decision_reason END
+                WHERE id = ?
+            ''', (title, description, translated_title, translated_description, languages, decision, details, item_id))
+            tags = conn.execute("SELECT tags FROM items WHERE id = ?", (item_id,)).fetchone()[0]
+            sync_item_facets(conn, item_id, languages, tags)
+            index_item(conn, item_id, title, description)
+    updates.clear()
@@ -0,0 +1,87 @@
+import logging
+from contextlib import contextmanager
+
+
+class Reporter:
+    """Receives the progress and error messages of the pipeline. The base class discards them."""
+
+    def error(self, message):
+        pass
+
+    def warning(self, message):
+        pass
+
+    def info(self, message):
+        pass
+
+    def success(self, message):
+        pass
+
+    def write(self, message):
+        pass
+
+    @contextmanager
+    def status(self, label):
+        self.write(label)
+        yield
+
+
+class StreamlitReporter(Reporter):
+    """Shows messages in the current Streamlit session."""
+
+    def error(self, message):
+        import streamlit as st
+        st.error(message)
+
+    def warning(self, message):
+        import streamlit as st
+        st.warning(message)
+
+    def info(self, message):
+        import streamlit as st
+        st.info(message)
+
+    def success(self, message):
+        import streamlit as st
+        st.success(message)
+
+    def write(self, message):
+        import streamlit as st
+        st.write(message)
+
+    def status(self, label):
+        import streamlit as st
+        return st.status(label)
+
+
+class LoggingReporter(Reporter):
+    """Sends messages to a logger, for batch runs outside Streamlit."""
+
+    def __init__(self, logger=None):
+        self.logger = logger or logging.getLogger("iiadb")
+
+    def error(self, message):
+        self.logger.error(message)
+
+    def warning(self, message):
+        self.logger.warning(message)
+
+    def info(self, message):
+        self.logger.info(message)
+
+    def success(self, message):
+        self.logger.info(message)
+
+    def write(self, message):
+        self.logger.info(message)
+
+
+# The app reports to Streamlit unless a batch run installs another reporter
+_reporter = StreamlitReporter()
+
+def get_reporter():
+    return _reporter
+
+def set_reporter(reporter):
+    global _reporter
+    _reporter = reporter
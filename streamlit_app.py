@@ -1,20 +1,28 @@
 import os
-import sqlite3
+import time
 import pandas as pd
 import json
+import tempfile
 from google.oauth2 import service_account
 import gspread
 from googleapiclient.discovery import build
-from googleapiclient.http import MediaIoBaseDownload, MediaFileUpload
 import streamlit as st
 from streamlit_option_menu import option_menu
-from tools import analyze_url
+from tools import analyze_url, translate_to_english
+from database import create_connection, create_tables, insert_item, fetch_good_bad_words, rescore_items
+from facets import sync_item_facets, facet_conditions, facet_counts
+from export import export_items, EXPORT_FORMATS
+from editing import ITEM_LABELS, diff_rows, save_item_changes
+from keywords import refresh_keyword_expansions, fetch_keyword_expansions
+from crawler import crawl
+from recrawl import recrawl
+from drive_sync import upload_database, download_database, CHUNK_SIZE
+from dedup import index_item, find_duplicates, duplicate_clusters, merge_cluster
 import validators
 
-# SQLite3 Database setup
-def create_connection():
-    conn = sqlite3.connect('iiadb.db')  # Local copy of the database
-    return conn
+# Exports are written here and removed when replaced, or once they are older than EXPORT_TTL seconds
+EXPORT_DIR = os.path.join(tempfile.gettempdir(), "iiadb_exports")
+EXPORT_TTL = 3600
 
 # Check if the database is already downloaded
 def download_db_if_needed():
@@ -26,13 +34,9 @@ def download_db_from_drive():
     try:
         service = build('drive', 'v3', credentials=credentials)
         file_id = st.secrets["db_id"]  # Your Google Drive file ID
-        request = service.files().get_media(fileId=file_id)
-        with open('iiadb.db', 'wb') as file:
-            downloader = MediaIoBaseDownload(file, request)
-            done = False
-            while not done:
-                status, done = downloader.next_chunk()
-                print(f"Download {int(status.progress() * 100)}% complete.")
+        chunk_size = st.secrets.get("drive_chunk_size", CHUNK_SIZE)
+        # Downloaded to a temporary file, decompressed and verified before replacing iiadb.db
+        download_database(service, file_id, 'iiadb.db', chunk_size, progress=lambda done: print(f"Download {int(done * 100)}% complete."))
     except Exception as e:
         st.error(f"Error downloading the database from Google Drive: {e}")
         raise
@@ -42,9 +46,11 @@ def upload_db_to_drive():
     try:
         service = build('drive', 'v3', credentials=credentials)
         file_id = st.secrets["db_id"]  # Your Google Drive file ID
-        media = MediaFileUpload('iiadb.db', mimetype='application/x-sqlite3')
-        request = service.files().update(fileId=file_id, media_body=media)
-        request.execute()
+        chunk_size = st.secrets.get("drive_chunk_size", CHUNK_SIZE)
+        # Uploads a compressed online-backup snapshot as a resumable, chunked transfer
+        progress_bar = st.progress(0.0, text="Uploading the database...")
+        upload_database(service, file_id, 'iiadb.db', chunk_size, progress=lambda done: progress_bar.progress(done, text="Uploading the database..."))
+        progress_bar.empty()
         st.success("Database successfully updated on Google Drive.")
     except Exception as e:
         st.error(f"Error uploading the database to Google Drive: {e}")
@@ -54,42 +60,14 @@ def upload_db_to_drive():
 def create_table():
     download_db_if_needed()  # Ensure the database is downloaded
     conn = create_connection()
-    cursor = conn.cursor()
-    cursor.execute(''' 
-        CREATE TABLE IF NOT EXISTS items (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            url TEXT NOT NULL,
-            decision TEXT,
-            decision_reason TEXT,
-            source TEXT,
-            title TEXT,
-            description TEXT,
-            title_translated TEXT,
-            description_translated TEXT,
-            tags TEXT,
-            notes TEXT,
-            languages TEXT
-        )
-    ''')
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS words_lists (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            word TEXT NOT NULL,
-            type TEXT NOT NULL CHECK(type IN ('Good', 'Bad'))
-        )
-    ''')
-    conn.commit()
+    create_tables(conn)
     conn.close()
 
 # Add a new item to the database
 def add_item(url, decision, decision_reason, source, title, description, title_translated, description_translated, tags, notes, languages):
     try:
         conn = create_connection()
-        cursor = conn.cursor()
-        cursor.execute(''' 
-            INSERT INTO items (url, decision, decision_reason, source, title, description, title_translated, description_translated, tags, notes, languages)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (url, decision, decision_reason, source, title, description, title_translated, description_translated, tags, notes, languages))
+        insert_item(conn, url, decision, decision_reason, source, title, description, title_translated, description_translated, tags, notes, languages)
         conn.commit()  # Save the changes
         conn.close()
         st.success("Item successfully added to the database!")
@@ -107,6 +85,8 @@ def update_item(item_id, url, decision, decision_reason, source, title, descript
             SET url = ?, decision = ?, decision_reason = ?, source = ?, title = ?, description = ?, title_translated = ?, description_translated = ?, tags = ?, notes = ?, languages = ?
             WHERE id = ?
         ''', (url, decision, decision_reason, source, title, description, title_translated, description_translated, tags, notes, languages, item_id))
+        sync_item_facets(conn, item_id, languages, tags)
+        index_item(conn, item_id, title, description)
         conn.commit()
         conn.close()
 
@@ -121,49 +101,58 @@ def manage_words_lists():
     conn = create_connection()
     cursor = conn.cursor()
 
-    # Add a word
-    with st.form("add_word_form"):
-        word = st.text_input("Word")
-        word_type = st.selectbox("Type", ["Good", "Bad"])
-        submit = st.form_submit_button("Add Word")
-        if submit:
-            cursor.execute("INSERT INTO words_lists (word, type) VALUES (?, ?)", (word, word_type))
-            conn.commit()
-            st.success("Word added successfully!")
-
-    # View existing words
+    # Add, edit or delete words in a grid, saved together in one transaction
     cursor.execute("SELECT * FROM words_lists")
     words = cursor.fetchall()
     df = pd.DataFrame(words, columns=["ID", "Word", "Type"])
-    st.dataframe(df)
-
-    # Edit or delete words
-    for row in words:
-        with st.expander(f"Edit/Delete Word ID: {row[0]}"):
-            new_word = st.text_input("Word", value=row[1], key=f"word_{row[0]}")
-            new_type = st.selectbox("Type", ["Good", "Bad"], index=["Good", "Bad"].index(row[2]), key=f"type_{row[0]}")
-            if st.button(f"Update Word ID {row[0]}", key=f"update_{row[0]}"):
-                cursor.execute("UPDATE words_lists SET word = ?, type = ? WHERE id = ?", (new_word, new_type, row[0]))
-                conn.commit()
-                st.success("Word updated successfully!")
-            if st.button(f"Delete Word ID {row[0]}", key=f"delete_{row[0]}"):
-                cursor.execute("DELETE FROM words_lists WHERE id = ?", (row[0],))
-                conn.commit()
-                st.warning("Word deleted!")
+    edited = st.data_editor(
+        df, key="words_editor", num_rows="dynamic", hide_index=True, disabled=["ID"],
+        column_config={"Type": st.column_config.SelectboxColumn("Type", options=["Good", "Bad"], required=True)}
+    )
+
+    if st.button("Save Words"):
+        try:
+            inserted, changes, deleted = diff_rows(df, edited)
+            inserted = inserted[inserted["Word"].fillna("").str.strip() != ""]
+            with conn:
+                conn.executemany("INSERT INTO words_lists (word, type) VALUES (?, ?)", inserted[["Word", "Type"]].fillna("Good").values.tolist())
+                words_after = edited.dropna(subset=["ID"]).astype({"ID": int}).set_index("ID")
+                conn.executemany(
+                    "UPDATE words_lists SET word = ?, type = ? WHERE id = ?",
+                    [(words_after.at[item_id, "Word"], words_after.at[item_id, "Type"], item_id) for item_id in changes]
+                )
+                conn.executemany("DELETE FROM words_lists WHERE id = ?", [(item_id,) for item_id in deleted])
+            if len(inserted) or changes or deleted:
+                # Translate only the words that are new to the lists
+                with st.spinner("Translating keywords..."):
+                    refresh_keyword_expansions(conn)
+                save_to_drive()
+            st.success(f"Words saved: {len(inserted)} added, {len(changes)} updated, {len(deleted)} deleted.")
+        except Exception as e:
+            st.error(f"Error saving words: {e}")
+
+    if st.button("Refresh Translations"):
+        try:
+            with st.spinner("Translating keywords..."):
+                added = refresh_keyword_expansions(conn)
+            st.success(f"Added {added} keyword translations.")
+            if added:
+                save_to_drive()
+        except Exception as e:
+            st.error(f"Error translating keywords: {e}")
 
     conn.close()
-    
-# Function to fetch good and bad words from the database
-def fetch_good_bad_words():
-    conn = create_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT word, type FROM words_lists")
-    words = cursor.fetchall()
-    conn.close()
-    
-    good_words = [word[0].lower() for word in words if word[1] == 'Good']
-    bad_words = [word[0].lower() for word in words if word[1] == 'Bad']
-    return good_words, bad_words
+
+    # Re-score the archive once the lists are edited
+    if st.button("Re-score Items"):
+        try:
+            with st.spinner("Re-scoring items..."):
+                updated = rescore_items()
+            st.success(f"Re-scored items, {updated} changed.")
+            if updated:
+                save_to_drive()
+        except Exception as e:
+            st.error(f"Error re-scoring items: {e}")
     
 # Function to view all items in the database
 def view_db():
@@ -190,7 +179,10 @@ def view_db():
 def update_form_with_analysis(url):
     good_words, bad_words = fetch_good_bad_words()
     try:
-        analyzed_data = analyze_url(url, good_words, bad_words)
+        conn = create_connection()
+        keyword_expansions = fetch_keyword_expansions(conn)
+        conn.close()
+        analyzed_data = analyze_url(url, good_words, bad_words, keyword_expansions)
         if analyzed_data:
             title, description, translated_title, translated_description, languages, decision, reason = analyzed_data
             
@@ -247,11 +239,25 @@ def add_new_item_form():
             analyze_button_bottom = st.form_submit_button("Analyze?")  
         with col3:
             clear_button = st.form_submit_button("Clear")
+        translate_button = st.form_submit_button("Translate")
         
         if analyze_button or analyze_button_bottom:
             with st.spinner('Analyzing...'):
                 update_form_with_analysis(url)
 
+        # Pages are scored in their own language, translation is only for display
+        if translate_button:
+            with st.spinner('Translating...'):
+                st.session_state["title"] = title
+                st.session_state["description"] = description
+                st.session_state["title_translated"] = translate_to_english(title)
+                st.session_state["description_translated"] = translate_to_english(description)
+                st.session_state["decision"] = decision
+                st.session_state["decision_reason"] = decision_reason
+                st.session_state["languages"] = languages
+                st.session_state["notes"] = notes
+            st.rerun()
+
         if add_item_submitted:
             if not validators.url(url):
                 st.error("Invalid URL. Please enter a valid URL.")
@@ -267,12 +273,155 @@ def add_new_item_form():
         if clear_button:
             st.session_state.clear()
             st.rerun()
+
+    # Warn about stored items that look like the analyzed page
+    if st.session_state["title"] or st.session_state["description"]:
+        show_probable_duplicates(st.session_state["title"], st.session_state["description"])
+
+# Function to list stored items that are near-duplicates of a title and description
+def show_probable_duplicates(title, description, exclude_id=None):
+    try:
+        conn = create_connection()
+        duplicates = find_duplicates(conn, title, description, exclude_id=exclude_id)
+        conn.commit()
+        conn.close()
+        if duplicates:
+            st.warning("Probable duplicates already in the database:")
+            st.dataframe(pd.DataFrame(duplicates, columns=["ID", "URL", "Title", "Distance"]), hide_index=True)
+    except Exception as e:
+        st.error(f"Error looking up duplicates: {e}")
+
+# Function to review and merge clusters of near-duplicate items
+def manage_duplicates():
+    create_table()
+    st.subheader("Near-Duplicate Items")
+    conn = create_connection()
+    try:
+        clusters = duplicate_clusters(conn)
+        if not clusters:
+            st.info("No duplicates found.")
+            return
+        st.write(f"Found {len(clusters)} clusters of probable duplicates.")
+        for cluster in clusters:
+            placeholders = ", ".join("?" * len(cluster))
+            rows = conn.execute(f"SELECT id, url, decision, title, source FROM items WHERE id IN ({placeholders})", cluster).fetchall()
+            with st.expander(f"{rows[0][3] or rows[0][1]} ({len(rows)} items)"):
+                st.dataframe(pd.DataFrame(rows, columns=["ID", "URL", "Decision", "Title", "Source"]), hide_index=True)
+                keep_id = st.selectbox("Keep", [row[0] for row in rows], key=f"keep_{cluster[0]}")
+                if st.button("Merge", key=f"merge_{cluster[0]}"):
+                    with conn:
+                        merge_cluster(conn, keep_id, cluster)
+                    save_to_drive()
+                    st.success(f"Merged into item ID {keep_id}.")
+                    st.rerun()
+    except Exception as e:
+        st.error(f"Error reviewing duplicates: {e}")
+    finally:
+        conn.close()
             
+# Build the WHERE clause of the simple keyword search
+def keyword_conditions(keyword):
+    where = """
+        url LIKE ? OR decision LIKE ? OR decision_reason LIKE ? 
+        OR source LIKE ? OR title LIKE ? OR description LIKE ? 
+        OR title_translated LIKE ? OR description_translated LIKE ? 
+        OR tags LIKE ? OR notes LIKE ? OR languages LIKE ?
+    """
+    return f"({where})", [f"%{keyword}%"] * 11
+
+# Function to export the database, optionally filtered, to a downloadable file
+def export_db():
+    create_table()
+    st.subheader("Export the Database")
+    conn = create_connection()
+    try:
+        counts = facet_counts(conn)
+        file_format = st.selectbox("Format", list(EXPORT_FORMATS.keys()))
+        keyword = st.text_input("Keyword (optional)")
+        col1, col2 = st.columns(2)
+        with col1:
+            decisions = st.multiselect("Decision", list(counts["decision"]))
+            languages = st.multiselect("Languages (all of)", list(counts["languages"]))
+        with col2:
+            sources = st.multiselect("Source", list(counts["source"]))
+            tags = st.multiselect("Tags (all of)", list(counts["tags"]))
+
+        if st.button("Export"):
+            where, params = facet_conditions(decisions, sources, languages, tags)
+            if keyword:
+                keyword_where, keyword_params = keyword_conditions(keyword)
+                where, params = f"{where} AND {keyword_where}", params + keyword_params
+            # Items are streamed in chunks to a temporary file rather than loaded into a DataFrame
+            remove_old_exports(st.session_state.pop("export_path", None))
+            with tempfile.NamedTemporaryFile(suffix=EXPORT_FORMATS[file_format], dir=EXPORT_DIR, delete=False) as file:
+                path = file.name
+            with st.spinner("Exporting..."):
+                count = export_items(conn, path, file_format, where, params)
+            st.session_state["export_path"] = path
+            st.session_state["export_name"] = f"iiadb{EXPORT_FORMATS[file_format]}"
+            st.success(f"Exported {count} items.")
+
+        if st.session_state.get("export_path") and os.path.exists(st.session_state["export_path"]):
+            with open(st.session_state["export_path"], "rb") as file:
+                st.download_button("Download", file, file_name=st.session_state["export_name"])
+    except Exception as e:
+        st.error(f"Error exporting the database: {e}")
+    finally:
+        conn.close()
+
+# Function to delete this session's previous export and abandoned exports of other sessions
+def remove_old_exports(previous_path=None):
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    cutoff = time.time() - EXPORT_TTL
+    for name in os.listdir(EXPORT_DIR):
+        path = os.path.join(EXPORT_DIR, name)
+        try:
+            if path == previous_path or os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        except OSError:
+            pass
+
+# Function to discover new candidate sites from the accepted items
+def crawl_for_candidates():
+    create_table()
+    st.subheader("Discover Related Sites")
+    st.write("Follows outbound links from items marked \"Yes\" and adds new sites as \"Maybe\" candidates.")
+    max_pages = st.number_input("Pages to fetch", min_value=1, max_value=10000, value=200)
+    max_depth = st.number_input("Maximum depth", min_value=1, max_value=5, value=2)
+    if st.button("Start Crawling"):
+        good_words, bad_words = fetch_good_bad_words()
+        conn = create_connection()
+        try:
+            pages, found = crawl(conn, good_words, bad_words, max_pages=max_pages, max_depth=max_depth)
+            if found:
+                save_to_drive()
+        except Exception as e:
+            st.error(f"Error crawling: {e}")
+        finally:
+            conn.close()
+
+# Function to refresh archived items whose pages changed
+def recrawl_items():
+    create_table()
+    st.subheader("Refresh Archived Items")
+    st.write("Checks the items that are due, stalest first. Only pages that changed are analyzed again.")
+    limit = st.number_input("Items to check", min_value=1, max_value=10000, value=200)
+    if st.button("Start Refresh"):
+        good_words, bad_words = fetch_good_bad_words()
+        conn = create_connection()
+        try:
+            checked, _ = recrawl(conn, good_words, bad_words, fetch_keyword_expansions(conn), limit=limit)
+            if checked:
+                save_to_drive()
+        except Exception as e:
+            st.error(f"Error refreshing items: {e}")
+        finally:
+            conn.close()
+
 # Save to Google Drive function
 def save_to_drive():
     try:
         upload_db_to_drive()  # Upload the updated database to Google Drive
-        download_db_from_drive()
     except Exception as e:
         st.error(f"Error saving to Google Drive: {e}")
 
@@ -292,15 +441,8 @@ def search_and_edit_items(mode="simple"):
         if mode == "simple":
             keyword = st.text_input("Enter a keyword to search:")
             if st.button("Search"):
-                query = """
-                    SELECT * FROM items 
-                    WHERE url LIKE ? OR decision LIKE ? OR decision_reason LIKE ? 
-                    OR source LIKE ? OR title LIKE ? OR description LIKE ? 
-                    OR title_translated LIKE ? OR description_translated LIKE ? 
-                    OR tags LIKE ? OR notes LIKE ? OR languages LIKE ?
-                """
-                params = tuple([f"%{keyword}%"] * 11)
-                cursor.execute(query, params)
+                where, params = keyword_conditions(keyword)
+                cursor.execute(f"SELECT * FROM items WHERE {where}", params)
         elif mode == "advanced":
             st.write("Specify your search criteria:")
             fields = [
@@ -322,51 +464,52 @@ def search_and_edit_items(mode="simple"):
                     cursor.execute(query, params)
                 else:
                     st.warning("Please provide at least one search criterion.")
+        elif mode == "faceted":
+            # Each facet shows how many of the currently filtered items carry each value
+            selected = {
+                "decisions": st.session_state.get("facet_decision", []),
+                "sources": st.session_state.get("facet_source", []),
+                "languages": st.session_state.get("facet_languages", []),
+                "tags": st.session_state.get("facet_tags", []),
+            }
+            counts = facet_counts(conn, **selected)
+            col1, col2 = st.columns(2)
+            for column, facet, label in ((col1, "decision", "Decision"), (col2, "source", "Source"), (col1, "languages", "Languages (all of)"), (col2, "tags", "Tags (all of)")):
+                options = list(dict.fromkeys(list(counts[facet]) + st.session_state.get(f"facet_{facet}", [])))
+                with column:
+                    st.multiselect(label, options, key=f"facet_{facet}", format_func=lambda value, facet=facet: f"{value} ({counts[facet].get(value, 0)})")
+
+            if st.button("Search"):
+                where, params = facet_conditions(**selected)
+                cursor.execute(f"SELECT * FROM items WHERE {where}", params)
         else:
             st.warning("Invalid search mode.")
             return
         
-        # Fetch and display search results
-        rows = cursor.fetchall()
+        # Keep the last search results so grid edits survive reruns
+        results_key = f"search_results_{mode}"
+        if cursor.description is not None:
+            st.session_state[results_key] = cursor.fetchall()
+        rows = st.session_state.get(results_key, [])
         if rows:
-            df = pd.DataFrame(rows, columns=[
-                "ID", "URL", "Decision", "Decision Reason", "Source", "Title", 
-                "Description", "Title Translated", "Description Translated", 
-                "Tags", "Notes", "Languages"
-            ])
+            df = pd.DataFrame(rows, columns=ITEM_LABELS)
             st.subheader("Search Results")
-            st.dataframe(df)
-
-            # Allow editing of each row
-            for row in rows:
-                with st.expander(f"Edit Item ID: {row[0]}"):
-                    url = st.text_input("URL", value=row[1], key=f"url_{row[0]}")
-                    decision = st.text_input("Decision", value=row[2], key=f"decision_{row[0]}")
-                    decision_reason = st.text_input("Decision Reason", value=row[3], key=f"reason_{row[0]}")
-                    source = st.text_input("Source", value=row[4], key=f"source_{row[0]}")
-                    title = st.text_input("Title", value=row[5], key=f"title_{row[0]}")
-                    description = st.text_area("Description", value=row[6], key=f"description_{row[0]}")
-                    title_translated = st.text_input("Title (Translated)", value=row[7], key=f"title_trans_{row[0]}")
-                    description_translated = st.text_area("Description (Translated)", value=row[8], key=f"description_trans_{row[0]}")
-                    tags = st.text_input("Tags", value=row[9], key=f"tags_{row[0]}")
-                    notes = st.text_area("Notes", value=row[10], key=f"notes_{row[0]}")
-                    languages = st.text_input("Languages", value=row[11], key=f"languages_{row[0]}")
-
-                    if st.button(f"Save Changes for ID {row[0]}", key=f"save_{row[0]}"):
-                        try:
-                            cursor.execute(''' 
-                                UPDATE items
-                                SET url = ?, decision = ?, decision_reason = ?, source = ?, title = ?, 
-                                    description = ?, title_translated = ?, description_translated = ?, 
-                                    tags = ?, notes = ?, languages = ?
-                                WHERE id = ?
-                            ''', (url, decision, decision_reason, source, title, description, 
-                                  title_translated, description_translated, tags, notes, languages, row[0]))
-                            conn.commit()
-                            save_to_drive()
-                            st.success(f"Item ID {row[0]} updated successfully!")
-                        except Exception as e:
-                            st.error(f"Error updating item ID {row[0]}: {e}")
+            edited = st.data_editor(
+                df, key=f"editor_{mode}", hide_index=True, disabled=["ID"],
+                column_config={"Decision": st.column_config.SelectboxColumn("Decision", options=["Yes", "Maybe", "No"])}
+            )
+
+            if st.button("Save Changes"):
+                try:
+                    _, changes, _ = diff_rows(df, edited)
+                    if changes:
+                        save_item_changes(conn, edited, changes)
+                        save_to_drive()
+                        placeholders = ", ".join("?" * len(rows))
+                        st.session_state[results_key] = conn.execute(f"SELECT * FROM items WHERE id IN ({placeholders}) ORDER BY id", [row[0] for row in rows]).fetchall()
+                    st.success(f"{len(changes)} items updated successfully!")
+                except Exception as e:
+                    st.error(f"Error updating items: {e}")
         else:
             st.info("No results found.")
     except Exception as e:
@@ -377,11 +520,14 @@ def search_and_edit_items(mode="simple"):
 # Update search mode selector to include editing
 def search_and_edit_mode_selector():
     st.subheader("Search and Edit the Database")
-    mode = st.radio("Select search mode:", options=["Simple", "Advanced"], index=0)
+    create_table()
+    mode = st.radio("Select search mode:", options=["Simple", "Advanced", "Faceted"], index=0)
     if mode == "Simple":
         search_and_edit_items(mode="simple")
     elif mode == "Advanced":
         search_and_edit_items(mode="advanced")
+    elif mode == "Faceted":
+        search_and_edit_items(mode="faceted")
 
 
 
@@ -418,18 +564,8 @@ if not authenticated:
                 st.sidebar.success("Credentials uploaded and authenticated successfully!")
                 authenticated = True
 
-                # Authenticate with Google API
-                service = build('drive', 'v3', credentials=credentials)
-
-                # Specify the file ID (replace with your own file ID)
-                file_id = st.secrets["db_id"]
-                request = service.files().get_media(fileId=file_id)
-                with open("iiadb.db", 'wb') as file:
-                    downloader = MediaIoBaseDownload(file, request)
-                    done = False
-                    while not done:
-                        status, done = downloader.next_chunk()
-                        st.info(f"Download {int(status.progress() * 100)}% complete.")
+                # Fetch the latest copy of the database from Google Drive
+                download_db_from_drive()
             except Exception as e:
                 st.sidebar.error(f"Error processing credentials: {e}")
 
@@ -439,6 +575,10 @@ apps = {
     "Add a New Item": add_new_item_form,
     "Search and Edit": search_and_edit_mode_selector,
     "Words Lists": manage_words_lists,
+    "Export": export_db,
+    "Duplicates": manage_duplicates,
+    "Discover Sites": crawl_for_candidates,
+    "Refresh Items": recrawl_items,
     "Save to Google Drive": save_to_drive  
 }
 
@@ -448,7 +588,7 @@ if authenticated:
         selected_app_name = option_menu(
             "Tools Menu",
             options=list(apps.keys()),
-            icons=["database", "link", "filter", "search", "list", "save"], 
+            icons=["database", "link", "filter", "search", "download", "copy", "globe", "arrow-repeat", "list", "save"], 
             menu_icon="tools",
             default_index=0,
             orientation="vertical"
@@ -0,0 +1,19 @@
+import sqlite3
+import pytest
+from database import create_tables, insert_item
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(":memory:")
+    create_tables(conn)
+    yield conn
+    conn.close()
+
+
+@pytest.fixture
+def add_item(conn):
+    def add(url, title="", description="", source="", tags="", languages="", decision="Maybe", notes=""):
+        with conn:
+            return insert_item(conn, url, decision, "", source, title, description, "", "", tags, notes, languages)
+    return add
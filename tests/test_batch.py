@@ -0,0 +1,27 @@
+import shlex
+import pytest
+import batch
+from batch import build_parser
+
+
+EXAMPLES = [line.split("python batch.py", 1)[1] for line in batch.__doc__.splitlines() if "python batch.py" in line]
+
+
+@pytest.mark.parametrize("example", EXAMPLES)
+def test_docstring_examples_parse(example):
+    build_parser().parse_args(shlex.split(example))
+
+
+def test_common_options_follow_the_command():
+    args = build_parser().parse_args(["crawl", "--max-pages", "500", "--sync", "--drive-file-id", "ID", "--credentials", "c.json", "--db", "x.db"])
+    assert (args.sync, args.drive_file_id, args.credentials, args.db, args.max_pages) == (True, "ID", "c.json", "x.db", 500)
+
+
+def test_missing_credentials_are_rejected():
+    with pytest.raises(SystemExit):
+        batch.main(["domains", "urls.txt", "--sheet-id", "S", "--keywords-id", "K"])
+
+
+def test_commands_run_on_an_empty_database(tmp_path):
+    for command in (["recrawl"], ["rescore"]):
+        assert batch.main(command + ["--db", str(tmp_path / "iiadb.db")]) == 0
@@ -0,0 +1,109 @@
+import pytest
+import requests
+import crawler
+from crawler import BloomFilter, canonical_url, registrable_domain, read_robots, crawl, HOST_DELAY
+from reporting import Reporter, set_reporter
+
+
+class Response:
+    def __init__(self, status_code, text="", content_type="text/html"):
+        self.status_code = status_code
+        self.text = text
+        self.headers = {"Content-Type": content_type}
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    sites = [f"site{i}.com" for i in range(1000)]
+    for site in sites:
+        bloom.add(site)
+    assert all(site in bloom for site in sites)
+    false_positives = sum(f"other{i}.com" in bloom for i in range(10000))
+    assert false_positives < 300
+
+
+@pytest.mark.parametrize("url, site", [
+    ("https://www.Example.com/page?q=1", "example.com"),
+    ("http://example.com.", "example.com"),
+    ("example.com/about", "example.com"),
+    ("https://blog.example.com", "blog.example.com"),
+    ("https://example.com:443/", "example.com"),
+    ("https://example.com:8080/", "example.com:8080"),
+])
+def test_canonical_url(url, site):
+    assert canonical_url(url) == site
+
+
+@pytest.mark.parametrize("site, domain", [
+    ("example.com", "example.com"),
+    ("a.blogspot.com", "blogspot.com"),
+    ("shop.example.co.il", "example.co.il"),
+    ("example.co.il", "example.co.il"),
+    ("news.bbc.co.uk", "bbc.co.uk"),
+    ("example.com:8080", "example.com"),
+    ("192.168.1.10", "192.168.1.10"),
+])
+def test_registrable_domain(site, domain):
+    assert registrable_domain(site) == domain
+
+
+@pytest.fixture
+def robots_response(monkeypatch):
+    response = {}
+
+    def fetch(url, headers):
+        assert url == "https://example.com/robots.txt"
+        if isinstance(response["value"], Exception):
+            raise response["value"]
+        return response["value"]
+
+    monkeypatch.setattr(crawler, "fetch", fetch)
+    return response
+
+
+def test_read_robots_rules(robots_response):
+    robots_response["value"] = Response(200, "User-agent: *\nDisallow: /private\nCrawl-delay: 5\n", "text/plain")
+    robots = read_robots("https://example.com/page")
+    assert robots.can_fetch("bot", "https://example.com/")
+    assert not robots.can_fetch("bot", "https://example.com/private/page")
+    assert robots.crawl_delay("bot") == 5
+
+
+@pytest.mark.parametrize("response, allowed", [
+    (Response(404), True),
+    (Response(410), True),
+    (Response(401), False),
+    (Response(403), False),
+    (Response(503), False),
+    (requests.exceptions.ConnectionError("down"), False),
+])
+def test_read_robots_status(robots_response, response, allowed):
+    robots_response["value"] = response
+    assert read_robots("https://example.com/").can_fetch("bot", "https://example.com/") == allowed
+
+
+def test_crawl_spaces_requests_to_the_same_domain(conn, add_item, monkeypatch):
+    set_reporter(Reporter())
+    clock = {"now": 1000.0}
+    monkeypatch.setattr(crawler.time, "time", lambda: clock["now"])
+    monkeypatch.setattr(crawler.time, "sleep", lambda seconds: clock.update(now=clock["now"] + seconds))
+    requested = []
+
+    def fetch(url, headers):
+        if url.endswith("/robots.txt"):
+            return Response(200, "User-agent: *\nCrawl-delay: 10\n" if "slow" in url else "", "text/plain")
+        requested.append((url, clock["now"]))
+        return Response(200, '<a href="https://new-site.org/">Klezmer band</a>')
+
+    monkeypatch.setattr(crawler, "fetch", fetch)
+    for url in ["https://a.blogspot.com", "https://b.blogspot.com", "https://example.org", "https://slow.example.net", "https://other.example.net"]:
+        add_item(url, decision="Yes")
+
+    pages, found = crawl(conn, ["klezmer"], [], max_pages=10, max_depth=1)
+    assert (pages, found) == (5, 1)
+    times = dict(requested)
+    assert abs(times["https://a.blogspot.com"] - times["https://b.blogspot.com"]) >= HOST_DELAY
+    assert abs(times["https://slow.example.net"] - times["https://other.example.net"]) >= 10
+    # Other domains are crawled while a domain waits
+    assert sorted(times.values())[:3] == [1000.0] * 3
+    assert conn.execute("SELECT decision, decision_reason FROM items WHERE url = 'https://new-site.org'").fetchone() == ("Maybe", "Found by crawler")
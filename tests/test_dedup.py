@@ -0,0 +1,70 @@
+from dedup import simhash, find_duplicates, duplicate_clusters, merge_cluster, _bands, _distance, MAX_DISTANCE, SIMHASH_BITS
+from facets import facet_counts
+
+
+TITLE = "Klezmer music archive"
+DESCRIPTION = "Recordings and sheet music of klezmer bands from Eastern Europe"
+
+
+def test_simhash_needs_enough_text():
+    assert simhash("", "") is None
+    assert simhash("Error", "short") is None
+
+
+def test_simhash_ignores_case_accents_and_punctuation():
+    assert simhash(TITLE, DESCRIPTION) == simhash(TITLE.upper(), DESCRIPTION + "!!")
+    assert simhash("Música judía", "") == simhash("musica judia", "")
+
+
+def test_simhash_is_a_signed_64_bit_integer():
+    fingerprint = simhash(TITLE, DESCRIPTION)
+    assert -(1 << (SIMHASH_BITS - 1)) <= fingerprint < 1 << (SIMHASH_BITS - 1)
+
+
+def test_fingerprints_within_max_distance_share_a_band():
+    fingerprint = simhash(TITLE, DESCRIPTION)
+    for bits in ([0, 1, 2], [5, 21, 37], [15, 31, 63], [40, 41, 42]):
+        other = fingerprint ^ sum(1 << bit for bit in bits)
+        assert _distance(fingerprint, other) == MAX_DISTANCE
+        assert set(_bands(fingerprint)) & set(_bands(other))
+
+
+def test_find_duplicates(conn, add_item):
+    first = add_item("a.com", TITLE, DESCRIPTION)
+    add_item("b.com", "Cooking recipes", "Weeknight dinners and desserts")
+    duplicates = find_duplicates(conn, TITLE + ".", DESCRIPTION)
+    assert [row[:2] for row in duplicates] == [(first, "a.com")]
+    assert find_duplicates(conn, TITLE, DESCRIPTION, exclude_id=first) == []
+
+
+def test_duplicate_clusters_groups_identical_and_near_duplicates(conn, add_item):
+    parked = [add_item(f"parked{i}.com", "This domain is for sale", "Buy this domain today") for i in range(50)]
+    near = [add_item("a.com", TITLE, DESCRIPTION), add_item("b.com", TITLE + "!", DESCRIPTION + ".")]
+    add_item("c.com", "Cooking recipes", "Weeknight dinners and desserts")
+    assert duplicate_clusters(conn) == sorted([sorted(parked), sorted(near)])
+
+
+def test_merge_cluster_keeps_the_kept_item_source(conn, add_item):
+    keep = add_item("a.com", TITLE, DESCRIPTION, source="s1", tags="music")
+    other = add_item("b.com", TITLE, DESCRIPTION, source="s2", tags="klezmer, music")
+    with conn:
+        merge_cluster(conn, keep, [keep, other])
+    source, tags, notes = conn.execute("SELECT source, tags, notes FROM items WHERE id = ?", (keep,)).fetchone()
+    assert source == "s1"
+    assert tags == "music, klezmer"
+    assert notes == "Merged duplicates: b.com\nMerged sources: s2"
+    assert conn.execute("SELECT COUNT(*) FROM items").fetchone()[0] == 1
+    assert facet_counts(conn)["source"] == {"s1": 1}
+    assert facet_counts(conn)["tags"] == {"music": 1, "klezmer": 1}
+
+
+def test_merge_cluster_cleans_up_rows_keyed_by_item(conn, add_item):
+    keep = add_item("a.com", TITLE, DESCRIPTION)
+    other = add_item("b.com", TITLE, DESCRIPTION)
+    with conn:
+        conn.execute("INSERT INTO item_fetch_state (item_id) VALUES (?)", (other,))
+        conn.execute("INSERT INTO crawl_urls (canonical_url, url, item_id, status) VALUES ('b.com', 'b.com', ?, 'archived')", (other,))
+        merge_cluster(conn, keep, [other])
+    assert conn.execute("SELECT COUNT(*) FROM item_fetch_state").fetchone()[0] == 0
+    assert conn.execute("SELECT COUNT(*) FROM item_simhash WHERE item_id = ?", (other,)).fetchone()[0] == 0
+    assert conn.execute("SELECT item_id FROM crawl_urls WHERE canonical_url = 'b.com'").fetchone() == (keep,)
@@ -0,0 +1,76 @@
+import gzip
+import sqlite3
+import pytest
+import drive_sync
+from drive_sync import compress_file, decompress_file, detect_encoding, expected_checksum, file_md5, IntegrityError, GZIP_MAGIC, ZSTD_MAGIC
+
+
+@pytest.fixture
+def database(tmp_path):
+    path = tmp_path / "iiadb.db"
+    conn = sqlite3.connect(path)
+    with conn:
+        conn.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, url TEXT)")
+        conn.executemany("INSERT INTO items (url) VALUES (?)", [(f"https://example{i}.com",) for i in range(1000)])
+    conn.close()
+    return path
+
+
+def test_zstd_round_trip(database, tmp_path):
+    pytest.importorskip("zstandard")
+    mimetype, sha256 = compress_file(database, tmp_path / "db.z")
+    assert mimetype == "application/zstd"
+    assert (tmp_path / "db.z").read_bytes().startswith(ZSTD_MAGIC)
+    assert decompress_file(tmp_path / "db.z", tmp_path / "out.db") == sha256
+    assert (tmp_path / "out.db").read_bytes() == database.read_bytes()
+
+
+def test_gzip_round_trip_without_zstandard(database, tmp_path, monkeypatch):
+    monkeypatch.setattr(drive_sync, "zstandard", None)
+    mimetype, sha256 = compress_file(database, tmp_path / "db.z")
+    assert mimetype == "application/gzip"
+    assert (tmp_path / "db.z").read_bytes().startswith(GZIP_MAGIC)
+    assert decompress_file(tmp_path / "db.z", tmp_path / "out.db") == sha256
+    assert (tmp_path / "out.db").read_bytes() == database.read_bytes()
+
+
+def test_uncompressed_database_is_copied(database, tmp_path):
+    sha256 = decompress_file(database, tmp_path / "out.db")
+    assert (tmp_path / "out.db").read_bytes() == database.read_bytes()
+    assert sha256 == compress_file(database, tmp_path / "db.z")[1]
+
+
+def test_unknown_file_is_rejected(tmp_path):
+    (tmp_path / "download").write_bytes(gzip.compress(b"not a database")[2:])
+    with pytest.raises(IntegrityError):
+        decompress_file(tmp_path / "download", tmp_path / "out.db")
+
+
+def test_detect_encoding(database, tmp_path):
+    mimetype, _ = compress_file(database, tmp_path / "db.z")
+    assert detect_encoding(tmp_path / "db.z") == mimetype
+    assert detect_encoding(database) == "application/x-sqlite3"
+    (tmp_path / "other").write_bytes(b"<html>")
+    assert detect_encoding(tmp_path / "other") is None
+
+
+def test_expected_checksum_while_the_upload_is_current(database, tmp_path):
+    mimetype, sha256 = compress_file(database, tmp_path / "db.z")
+    md5 = file_md5(tmp_path / "db.z")
+    metadata = {"md5Checksum": md5, "appProperties": {"sha256": sha256, "md5": md5, "encoding": mimetype}}
+    assert expected_checksum(metadata, mimetype) == sha256
+
+
+def test_expected_checksum_after_another_client_replaced_the_file(database, tmp_path):
+    mimetype, sha256 = compress_file(database, tmp_path / "db.z")
+    properties = {"sha256": sha256, "md5": file_md5(tmp_path / "db.z"), "encoding": mimetype}
+    # A raw upload leaves appProperties in place, but Drive's md5Checksum changes
+    metadata = {"md5Checksum": file_md5(database), "appProperties": properties}
+    assert expected_checksum(metadata, "application/x-sqlite3") is None
+
+
+def test_expected_checksum_of_uploads_without_md5(tmp_path):
+    metadata = {"md5Checksum": "abc", "appProperties": {"sha256": "123", "encoding": "application/zstd"}}
+    assert expected_checksum(metadata, "application/zstd") == "123"
+    assert expected_checksum(metadata, "application/x-sqlite3") is None
+    assert expected_checksum({"md5Checksum": "abc"}, "application/x-sqlite3") is None
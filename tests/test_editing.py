@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+from editing import ITEM_LABELS, diff_rows, save_item_changes
+from tools import MANUAL_REASON
+
+
+def original():
+    return pd.DataFrame({"ID": [1, 2, 3], "Title": ["a", "b", None], "Tags": ["x", "", "z"]})
+
+
+def test_diff_rows_without_edits():
+    inserted, changes, deleted = diff_rows(original(), original())
+    assert inserted.empty
+    assert changes == {}
+    assert deleted == []
+
+
+def test_diff_rows_finds_changed_cells():
+    edited = original()
+    edited.loc[0, "Title"] = "A"
+    edited.loc[2, "Tags"] = "y"
+    _, changes, _ = diff_rows(original(), edited)
+    assert changes == {1: {"Title": "A"}, 3: {"Tags": "y"}}
+
+
+def test_diff_rows_treats_missing_values_as_empty():
+    edited = original()
+    edited.loc[1, "Tags"] = None
+    edited.loc[2, "Title"] = ""
+    _, changes, _ = diff_rows(original(), edited)
+    assert changes == {}
+
+
+def test_diff_rows_finds_inserted_and_deleted_rows():
+    edited = pd.concat([original().iloc[[0, 2]], pd.DataFrame({"ID": [np.nan], "Title": ["new"], "Tags": [""]})], ignore_index=True)
+    inserted, changes, deleted = diff_rows(original(), edited)
+    assert inserted.to_dict("records") == [{"Title": "new", "Tags": ""}]
+    assert changes == {}
+    assert deleted == [2]
+
+
+def test_save_item_changes_marks_decisions_changed_by_hand(conn, add_item):
+    item_id = add_item("a.com", "Title", decision="Maybe")
+    edited = pd.DataFrame([[item_id, "a.com", "Yes", "", "", "Title", "", "", "", "", "", ""]], columns=ITEM_LABELS)
+    save_item_changes(conn, edited, {item_id: {"Decision": "Yes"}})
+    assert conn.execute("SELECT decision, decision_reason FROM items").fetchone() == ("Yes", MANUAL_REASON)
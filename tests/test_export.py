@@ -0,0 +1,51 @@
+import csv
+import pytest
+from export import export_items, ITEM_COLUMNS, EXPORT_FORMATS
+from facets import facet_conditions
+
+
+@pytest.fixture
+def items(conn, add_item):
+    add_item("a.com", "Klezmer \x07archive", "Recordings", source="s1", tags="music", languages="english", decision="Yes")
+    add_item("b.com", "Cooking", None, source="s2", decision="Maybe")
+    add_item("c.com", "Música judía", "", source="s1", decision="Yes")
+
+
+def read_export(path, file_format):
+    if file_format == "CSV":
+        with open(path, newline="", encoding="utf-8") as file:
+            rows = list(csv.reader(file))
+        return rows[0], [dict(zip(rows[0], row)) for row in rows[1:]]
+    if file_format == "XLSX":
+        from openpyxl import load_workbook
+        rows = list(load_workbook(path, read_only=True)["items"].values)
+        return list(rows[0]), [dict(zip(rows[0], row)) for row in rows[1:]]
+    import pyarrow.parquet as pq
+    table = pq.read_table(path)
+    return table.column_names, table.to_pylist()
+
+
+@pytest.mark.parametrize("file_format", list(EXPORT_FORMATS))
+def test_export_items(conn, items, tmp_path, file_format):
+    path = tmp_path / f"items{EXPORT_FORMATS[file_format]}"
+    # A chunk size smaller than the result checks that every chunk is written
+    assert export_items(conn, str(path), file_format, chunk_size=2) == 3
+    columns, rows = read_export(path, file_format)
+    assert columns == ITEM_COLUMNS
+    assert [row["url"] for row in rows] == ["a.com", "b.com", "c.com"]
+    assert rows[2]["title"] == "Música judía"
+    # Control characters aren't valid in XLSX cells and are dropped there
+    assert rows[0]["title"] == ("Klezmer archive" if file_format == "XLSX" else "Klezmer \x07archive")
+
+
+@pytest.mark.parametrize("file_format", list(EXPORT_FORMATS))
+def test_export_items_with_a_filter(conn, items, tmp_path, file_format):
+    where, params = facet_conditions(decisions=["Yes"], sources=["s1"], tags=["music"])
+    path = tmp_path / f"items{EXPORT_FORMATS[file_format]}"
+    assert export_items(conn, str(path), file_format, where, params) == 1
+    assert [row["url"] for row in read_export(path, file_format)[1]] == ["a.com"]
+
+
+def test_export_items_rejects_unknown_formats(conn, tmp_path):
+    with pytest.raises(ValueError):
+        export_items(conn, str(tmp_path / "items.json"), "JSON")
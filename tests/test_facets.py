@@ -0,0 +1,30 @@
+from facets import facet_conditions, filter_items, facet_counts
+
+
+def test_facet_conditions_without_filters():
+    assert facet_conditions() == ("1 = 1", [])
+
+
+def test_facet_conditions():
+    where, params = facet_conditions(["Yes", "Maybe"], ["crawl"], [" English "], ["Music", "klezmer"])
+    assert where == (
+        "items.decision IN (?, ?) AND items.source IN (?)"
+        " AND items.id IN (SELECT item_id FROM item_languages WHERE language = ?)"
+        " AND items.id IN (SELECT item_id FROM item_tags WHERE tag = ? INTERSECT SELECT item_id FROM item_tags WHERE tag = ?)"
+    )
+    assert params == ["Yes", "Maybe", "crawl", "english", "music", "klezmer"]
+
+
+def test_filter_items_matches_all_languages_and_tags(conn, add_item):
+    both = add_item("a.com", tags="music, klezmer", languages="english, hebrew", decision="Yes")
+    add_item("b.com", tags="music", languages="english", decision="Yes")
+    add_item("c.com", tags="music, klezmer", languages="english", decision="No")
+    rows = filter_items(conn, decisions=["Yes"], languages=["Hebrew"], tags=["music", "klezmer"])
+    assert [row[0] for row in rows] == [both]
+
+
+def test_facet_counts_within_a_filter(conn, add_item):
+    add_item("a.com", source="s1", tags="music, klezmer", languages="english", decision="Yes")
+    add_item("b.com", source="s2", tags="music", languages="english", decision="Maybe")
+    counts = facet_counts(conn, tags=["klezmer"])
+    assert counts == {"decision": {"Yes": 1}, "source": {"s1": 1}, "languages": {"english": 1}, "tags": {"music": 1, "klezmer": 1}}
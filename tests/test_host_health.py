@@ -0,0 +1,120 @@
+import pytest
+import requests
+import host_health
+from host_health import fetch, classify_error, is_host_blocked, record_host_failure, HostUnavailableError, FAILURE_THRESHOLD, MAX_RETRIES, NEGATIVE_TTL
+
+
+class Response:
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    """Replaces requests.get with a queue of responses or exceptions, and records the calls."""
+    monkeypatch.setattr(host_health, "HOST_HEALTH_DB", str(tmp_path / "host_health.db"))
+    monkeypatch.setattr(host_health.time, "sleep", lambda seconds: None)
+    server = {"results": [], "calls": 0}
+
+    def get(url, **kwargs):
+        server["calls"] += 1
+        result = server["results"].pop(0) if len(server["results"]) > 1 else server["results"][0]
+        if isinstance(result, Exception):
+            raise result
+        return Response(result)
+
+    monkeypatch.setattr(host_health.requests, "get", get)
+    return server
+
+
+def failures(host):
+    conn = host_health._connect()
+    try:
+        return conn.execute("SELECT failures, blocked_until FROM host_health WHERE host = ?", (host,)).fetchone()
+    finally:
+        conn.close()
+
+
+@pytest.mark.parametrize("error, kind", [
+    (requests.exceptions.SSLError("bad certificate"), "ssl"),
+    (requests.exceptions.ConnectTimeout("slow"), "timeout"),
+    (requests.exceptions.ReadTimeout("slow"), "timeout"),
+    (requests.exceptions.ConnectionError("NameResolutionError: Failed to resolve"), "dns"),
+    (requests.exceptions.ConnectionError("Connection refused"), "connect"),
+    (requests.exceptions.ChunkedEncodingError("broken"), "error"),
+])
+def test_classify_error(error, kind):
+    assert classify_error(error) == kind
+
+
+def test_get_host():
+    assert host_health.get_host("https://www.Example.com/page") == "example.com"
+
+
+@pytest.mark.parametrize("error", [requests.exceptions.InvalidURL("bad"), requests.exceptions.MissingSchema("bad"), requests.exceptions.TooManyRedirects("loop")])
+def test_request_errors_are_raised_without_retrying_or_blocking(server, error):
+    server["results"] = [error]
+    with pytest.raises(type(error)):
+        fetch("https://example.com")
+    assert server["calls"] == 1
+    assert failures("example.com") is None
+
+
+def test_timeouts_are_retried(server):
+    server["results"] = [requests.exceptions.ReadTimeout("slow"), 200]
+    assert fetch("https://example.com").status_code == 200
+    assert server["calls"] == 2
+    assert failures("example.com") is None
+
+
+def test_dns_failures_are_not_retried(server):
+    server["results"] = [requests.exceptions.ConnectionError("Name or service not known")]
+    with pytest.raises(requests.exceptions.ConnectionError):
+        fetch("https://example.com")
+    assert server["calls"] == 1
+    assert failures("example.com")[0] == 1
+
+
+def test_host_is_blocked_after_consecutive_failures(server):
+    server["results"] = [requests.exceptions.ConnectionError("Connection refused")]
+    for _ in range(FAILURE_THRESHOLD - 1):
+        with pytest.raises(requests.exceptions.ConnectionError):
+            fetch("https://example.com")
+        assert is_host_blocked("example.com") == (False, None)
+    with pytest.raises(requests.exceptions.ConnectionError):
+        fetch("https://example.com")
+    assert is_host_blocked("example.com")[0]
+
+    calls = server["calls"]
+    with pytest.raises(HostUnavailableError):
+        fetch("https://www.example.com/other")
+    assert server["calls"] == calls
+
+
+def test_block_doubles_with_further_failures(server):
+    blocks = []
+    for _ in range(FAILURE_THRESHOLD + 1):
+        record_host_failure("example.com", "connect", "Connection refused")
+        blocks.append(round(host_health._connect().execute("SELECT blocked_until - last_failure FROM host_health").fetchone()[0]))
+    assert blocks == [0] * (FAILURE_THRESHOLD - 1) + [NEGATIVE_TTL["connect"], NEGATIVE_TTL["connect"] * 2]
+
+
+def test_success_resets_the_failures(server):
+    server["results"] = [requests.exceptions.ConnectionError("Connection refused"), 200]
+    with pytest.raises(requests.exceptions.ConnectionError):
+        fetch("https://example.com")
+    assert fetch("https://example.com").status_code == 200
+    assert failures("example.com") is None
+
+
+def test_success_without_failures_writes_nothing(server, monkeypatch):
+    server["results"] = [200]
+    monkeypatch.setattr(host_health, "record_host_success", lambda host: pytest.fail("unexpected write"))
+    assert fetch("https://example.com").status_code == 200
+
+
+def test_server_errors_are_retried_then_counted(server):
+    server["results"] = [503]
+    assert fetch("https://example.com").status_code == 503
+    assert server["calls"] == MAX_RETRIES + 1
+    assert failures("example.com")[0] == 1
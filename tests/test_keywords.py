@@ -0,0 +1,76 @@
+import pytest
+import keywords
+from keywords import refresh_keyword_expansions, fetch_keyword_expansions
+
+
+TRANSLATIONS = {
+    ("music", "es"): "Música",
+    ("music", "fr"): "musique",
+    ("jewish", "es"): "judía",
+    ("jewish", "fr"): "juif",
+    ("casino", "es"): "casino",
+    ("casino", "fr"): "casino",
+    ("synagogue", "es"): "sinagoga",
+    ("synagogue", "fr"): "la synagogue",
+}
+LANGUAGES = {"spanish": "es", "french": "fr"}
+
+
+@pytest.fixture
+def translations(monkeypatch):
+    calls = []
+
+    def translate_from_english(word, code):
+        calls.append((word, code))
+        return TRANSLATIONS.get((word, code))
+
+    monkeypatch.setattr(keywords, "translate_from_english", translate_from_english)
+    return calls
+
+
+def add_words(conn, words):
+    with conn:
+        conn.executemany("INSERT INTO words_lists (word, type) VALUES (?, ?)", words)
+
+
+def test_refresh_keyword_expansions(conn, translations):
+    add_words(conn, [("Music ", "Good"), ("jewish", "Good"), ("casino", "Bad")])
+    assert refresh_keyword_expansions(conn, LANGUAGES) == 6
+    expansions = fetch_keyword_expansions(conn)
+    assert sorted(expansions["spanish"][0]) == ["judía", "música"]
+    assert expansions["french"][1] == ["casino"]
+
+
+def test_only_new_words_are_translated(conn, translations):
+    add_words(conn, [("music", "Good")])
+    refresh_keyword_expansions(conn, LANGUAGES)
+    add_words(conn, [("jewish", "Good")])
+    translations.clear()
+    assert refresh_keyword_expansions(conn, LANGUAGES) == 2
+    assert sorted(translations) == [("jewish", "es"), ("jewish", "fr")]
+
+
+def test_stale_expansions_are_dropped(conn, translations):
+    add_words(conn, [("music", "Good"), ("casino", "Bad")])
+    refresh_keyword_expansions(conn, LANGUAGES)
+    with conn:
+        conn.execute("DELETE FROM words_lists WHERE word = 'casino'")
+    refresh_keyword_expansions(conn, {"spanish": "es"})
+    assert conn.execute("SELECT word, language FROM words_expansions").fetchall() == [("music", "spanish")]
+
+
+def test_multi_word_translations_never_match_and_are_not_retranslated(conn, translations):
+    add_words(conn, [("synagogue", "Good")])
+    refresh_keyword_expansions(conn, LANGUAGES)
+    assert fetch_keyword_expansions(conn) == {"spanish": (["sinagoga"], [])}
+    translations.clear()
+    refresh_keyword_expansions(conn, LANGUAGES)
+    assert translations == []
+
+
+def test_failed_translations_are_retried(conn, translations):
+    add_words(conn, [("klezmer", "Good")])
+    assert refresh_keyword_expansions(conn, LANGUAGES) == 0
+    translations.clear()
+    refresh_keyword_expansions(conn, LANGUAGES)
+    assert sorted(translations) == [("klezmer", "es"), ("klezmer", "fr")]
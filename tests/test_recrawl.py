@@ -0,0 +1,113 @@
+import pytest
+import recrawl
+from recrawl import recrawl as run_recrawl, INITIAL_INTERVAL, MIN_INTERVAL, FAILURE_INTERVAL
+from reporting import Reporter, set_reporter
+from tools import MANUAL_REASON
+
+
+class Response:
+    def __init__(self, status_code, title="", description="", etag=None):
+        self.status_code = status_code
+        self.text = f'<html><head><title>{title}</title><meta name="description" content="{description}"></head></html>'
+        self.headers = {"ETag": etag} if etag else {}
+        self.encoding = None
+
+
+@pytest.fixture
+def site(monkeypatch):
+    """A fake site serving one page, answering conditional GETs with 304 when the ETag matches."""
+    set_reporter(Reporter())
+    page = {"title": "Klezmer archive", "description": "Recordings", "etag": '"v1"', "fail": False, "requests": []}
+
+    def fetch(url, headers):
+        page["requests"].append(headers)
+        if page["fail"]:
+            raise recrawl.requests.exceptions.ConnectionError("down")
+        if headers.get("If-None-Match") == page["etag"]:
+            return Response(304)
+        return Response(200, page["title"], page["description"], page["etag"])
+
+    def analyze_page(url, title, description, good_keywords, bad_keywords, keyword_expansions=None):
+        if page.get("analysis_fails"):
+            return "Error", "", "", "", "", "Error", "Error"
+        return title, description, "", "", ["english"], "Yes", "1 good keywords"
+
+    monkeypatch.setattr(recrawl, "fetch", fetch)
+    monkeypatch.setattr(recrawl, "analyze_page", analyze_page)
+    return page
+
+
+def state(conn):
+    return conn.execute("SELECT etag, interval, next_check - last_checked, check_count, change_count FROM item_fetch_state").fetchone()
+
+
+def make_due(conn):
+    with conn:
+        conn.execute("UPDATE item_fetch_state SET next_check = 0")
+
+
+def test_unchanged_page_backs_off(conn, add_item, site):
+    add_item("a.com", "Klezmer archive", "Recordings", decision="Yes")
+    assert run_recrawl(conn, [], []) == (1, 0)
+    assert state(conn) == ('"v1"', INITIAL_INTERVAL * 2, INITIAL_INTERVAL * 2, 1, 0)
+    assert site["requests"][0]["Cache-Control"] == "no-store"
+
+    make_due(conn)
+    assert run_recrawl(conn, [], []) == (1, 0)
+    assert site["requests"][1]["If-None-Match"] == '"v1"'
+    assert state(conn)[1:] == (INITIAL_INTERVAL * 4, INITIAL_INTERVAL * 4, 2, 0)
+
+
+def test_changed_page_is_reanalyzed(conn, add_item, site):
+    item_id = add_item("a.com", "Old title", "Recordings", decision="Maybe")
+    with conn:
+        conn.execute("UPDATE items SET decision_reason = 'No good keywords'")
+    assert run_recrawl(conn, [], []) == (1, 1)
+    assert conn.execute("SELECT title, decision, decision_reason FROM items").fetchone() == ("Klezmer archive", "Yes", "1 good keywords")
+    assert state(conn) == ('"v1"', INITIAL_INTERVAL / 2, INITIAL_INTERVAL / 2, 1, 1)
+    assert conn.execute("SELECT COUNT(*) FROM item_simhash WHERE item_id = ?", (item_id,)).fetchone()[0] == 1
+
+
+def test_changed_page_keeps_manual_decisions(conn, add_item, site):
+    add_item("a.com", "Old title", "Recordings", decision="Maybe")
+    with conn:
+        conn.execute("UPDATE items SET decision_reason = ?", (MANUAL_REASON,))
+    run_recrawl(conn, [], [])
+    assert conn.execute("SELECT title, decision, decision_reason FROM items").fetchone() == ("Klezmer archive", "Maybe", MANUAL_REASON)
+
+
+def test_interval_never_drops_below_the_minimum(conn, add_item, site):
+    add_item("a.com", "Old title", "Recordings")
+    with conn:
+        conn.execute("INSERT INTO item_fetch_state (item_id, interval) SELECT id, ? FROM items", (MIN_INTERVAL,))
+    run_recrawl(conn, [], [])
+    assert state(conn)[1] == MIN_INTERVAL
+
+
+def test_failure_retries_later_and_keeps_the_interval(conn, add_item, site):
+    add_item("a.com", "Klezmer archive", "Recordings")
+    run_recrawl(conn, [], [])
+    site["fail"] = True
+    make_due(conn)
+    assert run_recrawl(conn, [], []) == (1, 0)
+    assert state(conn)[:3] == ('"v1"', INITIAL_INTERVAL * 2, FAILURE_INTERVAL)
+
+
+def test_failed_analysis_keeps_the_old_validators(conn, add_item, site):
+    add_item("a.com", "Old title", "Recordings")
+    run_recrawl(conn, [], [])
+    site.update(title="New title", etag='"v2"', analysis_fails=True)
+    make_due(conn)
+    run_recrawl(conn, [], [])
+    assert state(conn)[0] == '"v1"'
+
+    site["analysis_fails"] = False
+    make_due(conn)
+    assert run_recrawl(conn, [], []) == (1, 1)
+    assert conn.execute("SELECT title FROM items").fetchone() == ("New title",)
+    assert state(conn)[0] == '"v2"'
+
+
+def test_rejected_items_are_not_checked(conn, add_item, site):
+    add_item("a.com", "Klezmer archive", "Recordings", decision="No")
+    assert run_recrawl(conn, [], []) == (0, 0)
@@ -0,0 +1,76 @@
+import pandas as pd
+import pytest
+from tools import calculate_score, calculate_scores, keywords_for_language, MANUAL_REASON
+from database import create_connection, create_tables, insert_item, rescore_items
+
+
+GOOD = ["music", "music", "jewish", "klezmer"]
+BAD = ["casino"]
+EXPANSIONS = {"spanish": (["música", "judía"], ["casino"])}
+
+ITEMS = [
+    # url, title, description, title_translated, description_translated, languages
+    ("https://example.com", "Klezmer music", "Jewish music archive", "", "", "english"),
+    ("https://example.com", "Nothing here", "", "", "", "english"),
+    ("https://example.co.il", "Nothing here", "", "", "", "english"),
+    ("https://example.co.il/", "Nothing here", "", "", "", "english"),
+    ("https://example.com", "Something", "", "", "", "english, hebrew"),
+    ("https://example.com", "Música judía", "Archivo de música", "", "", "spanish"),
+    ("https://example.com", "Musique juive", "", "Jewish music", "", "french"),
+    ("https://example.com", "Musique juive", "", "", "", "french"),
+    ("https://example.com", None, None, None, None, None),
+]
+
+
+def expected_score(url, title, description, title_translated, description_translated, languages):
+    languages = [language.strip().lower() for language in (languages or "").split(",")]
+    if languages[0] != "english" and (title_translated or description_translated):
+        return calculate_score(url, title_translated, description_translated, languages, GOOD, BAD)
+    good, bad = keywords_for_language(GOOD, BAD, EXPANSIONS, languages[0])
+    return calculate_score(url, title, description, languages, good, bad)
+
+
+def items_frame(rows):
+    columns = ["url", "title", "description", "title_translated", "description_translated", "languages"]
+    return pd.DataFrame(rows, columns=columns)
+
+
+@pytest.mark.parametrize("row", ITEMS)
+def test_calculate_scores_matches_calculate_score(row):
+    scores = calculate_scores(items_frame([row]), GOOD, BAD, EXPANSIONS)
+    assert tuple(scores.iloc[0]) == expected_score(*row)
+
+
+def test_calculate_scores_counts_duplicate_keywords_per_occurrence():
+    scores = calculate_scores(items_frame([ITEMS[0]]), GOOD, BAD)
+    # "music" is listed twice and appears twice, plus "klezmer" and "jewish"
+    assert scores.iloc[0]["decision_reason"] == "6 good keywords"
+
+
+def test_calculate_scores_keeps_index_with_duplicate_labels():
+    items = items_frame(ITEMS[:3])
+    items.index = [7, 7, 8]
+    scores = calculate_scores(items, GOOD, BAD, EXPANSIONS)
+    assert list(scores.index) == [7, 7, 8]
+    assert [tuple(row) for row in scores.itertuples(index=False)] == [expected_score(*row) for row in ITEMS[:3]]
+
+
+def test_rescore_items_leaves_manual_decisions_alone(tmp_path):
+    path = str(tmp_path / "iiadb.db")
+    conn = create_connection(path)
+    create_tables(conn)
+    with conn:
+        conn.execute("INSERT INTO words_lists (word, type) VALUES ('klezmer', 'Good')")
+        for decision, reason in [("Maybe", "No good keywords"), ("Yes", "2 good keywords"), ("Maybe", "Found by crawler"),
+                                 ("Yes", "Curator knows the band"), ("Yes", MANUAL_REASON), ("No", "No good keywords"), ("Maybe", "")]:
+            insert_item(conn, "https://example.com", decision, reason, "", "Klezmer", "", "", "", "", "", "english")
+    conn.close()
+
+    assert rescore_items(db_path=path) == 3
+    conn = create_connection(path)
+    rows = conn.execute("SELECT decision, decision_reason FROM items ORDER BY id").fetchall()
+    conn.close()
+    assert rows == [
+        ("Yes", "1 good keywords"), ("Yes", "1 good keywords"), ("Yes", "1 good keywords"),
+        ("Yes", "Curator knows the band"), ("Yes", MANUAL_REASON), ("No", "No good keywords"), ("Maybe", ""),
+    ]
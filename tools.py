@@ -7,12 +7,15 @@ import re
 from collections import Counter
 from datetime import datetime
 import pytz
-import streamlit as st
 from urllib.parse import urlparse, urlunparse
 import time
 import random
 import requests_cache
 import spacy
+import numpy as np
+import pandas as pd
+from host_health import fetch
+from reporting import get_reporter
 
 
 # Install cache for HTTP requests
@@ -23,9 +26,14 @@ headers = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/
 
 # Error handler function to streamline error handling
 def error_handler(function, item, error_message):
-    st.error(f"Error processing {function} for '{item}': {error_message}")
+    get_reporter().error(f"Error processing {function} for '{item}': {error_message}")
     return "Error", "Error"
 
+# Function to read a setting from the Streamlit secrets when it isn't passed in
+def get_secret(name):
+    import streamlit as st
+    return st.secrets[name]
+
 def extract_domain_from_url(url):
     try:
         domain = urlparse(url).netloc
@@ -106,7 +114,7 @@ def guess_words(concatenated_sentence):
         # Convert set to a list and return it
         return list(all_valid_words)
     except Exception as e:
-        error_handler("guess words", url, e)
+        error_handler("guess words", concatenated_sentence, e)
         return "Error"
 
 # Function to calculate score based on keyword matching
@@ -157,9 +165,9 @@ def google_search(query, num_results=100, language="en"):
             break  # Stop the loop if there's an error
 
     if results:
-        st.info(f"Fetched {len(results)} results for '{query}'")
+        get_reporter().info(f"Fetched {len(results)} results for '{query}'")
     else:
-        st.error(f"No results found for the '{query}'")
+        get_reporter().error(f"No results found for the '{query}'")
     return results
 
 
@@ -171,15 +179,10 @@ def get_title(url):
         # Add scheme if missing
         if not re.match(r'^https?://', url):
             url = 'https://' + url
-        response = requests.get(url, timeout=120, headers=headers)
+        response = fetch(url, headers=headers)
         response.encoding = 'utf-8'
         soup = BeautifulSoup(response.text, 'html.parser')
-        # Try to get the title
-        title = soup.title.string if soup.title else ""
-        title = re.sub(r'[\r\n]+', ' ', title.strip()) if title else ""
-        if title is not str:
-            title = str(title)
-        return title
+        return extract_title(soup)
     except requests.exceptions.RequestException as e:
         error_handler("get title", url, e)
         return "Error"
@@ -192,20 +195,33 @@ def get_description(url):
         # Add scheme if missing
         if not re.match(r'^https?://', url):
             url = 'https://' + url
-        response = requests.get(url, timeout=120, headers=headers)
+        response = fetch(url, headers=headers)
         response.encoding = 'utf-8'
         soup = BeautifulSoup(response.text, 'html.parser')
-        # Try to get the description
-        description_tag = soup.find('meta', attrs={'name': 'description'}) or soup.find('meta', attrs={'property': 'og:description'})
-        description = description_tag['content'] if description_tag else ""
-        description = re.sub(r'[\r\n]+', ' ', description.strip()) if description else ""
-        if description is not str:
-            description = str(description)
-        return description
+        return extract_description(soup)
     except requests.exceptions.RequestException as e:
         error_handler("get description", url, e)
         return "Error"
 
+# Function to extract the title from a parsed page
+def extract_title(soup):
+    # Try to get the title
+    title = soup.title.string if soup.title else ""
+    title = re.sub(r'[\r\n]+', ' ', title.strip()) if title else ""
+    if title is not str:
+        title = str(title)
+    return title
+
+# Function to extract the description from a parsed page
+def extract_description(soup):
+    # Try to get the description
+    description_tag = soup.find('meta', attrs={'name': 'description'}) or soup.find('meta', attrs={'property': 'og:description'})
+    description = description_tag['content'] if description_tag else ""
+    description = re.sub(r'[\r\n]+', ' ', description.strip()) if description else ""
+    if description is not str:
+        description = str(description)
+    return description
+
 # Helper function to combine title and description text
 def combine_text(title, description):
     try:
@@ -255,6 +271,24 @@ def translate_to_english(input):
         error_handler("translating", input, e)
         return input
 
+def translate_from_english(input, dest):
+    translator = Translator()
+    try:
+        translation = translator.translate(input, src='en', dest=dest)
+        return translation.text
+    except Exception as e:
+        error_handler("translating", input, e)
+        return None
+
+# Function to add the expansions of a language to the English keywords
+def keywords_for_language(good_keywords, bad_keywords, keyword_expansions, language):
+    """
+    :param keyword_expansions: A dict mapping a language to its (good, bad) translated keywords.
+    :return: The (good, bad) keywords to match text in that language.
+    """
+    good_expansion, bad_expansion = (keyword_expansions or {}).get(language, ([], []))
+    return list(good_keywords) + list(good_expansion), list(bad_keywords) + list(bad_expansion)
+
 
 def count_keywords(title, description, good_keywords, bad_keywords):
     """Count occurrences of good and bad keywords in the title and description."""
@@ -269,6 +303,15 @@ def count_keywords(title, description, good_keywords, bad_keywords):
         error_handler("counting keywords", title, e)
         return 0, 0
     
+# Decision reasons written by the scorer and the crawler. Items with any other reason, or with
+# decision "No", were decided by hand and are never re-scored.
+AUTOMATIC_REASONS = ("Hebrew / .il", "No good keywords", "Found by crawler")
+MANUAL_REASON = "Set by hand"
+AUTOMATIC_DECISION_SQL = (
+    "(decision IS NULL OR decision != 'No') AND "
+    f"(decision_reason IN ({', '.join(repr(reason) for reason in AUTOMATIC_REASONS)}) OR decision_reason GLOB '[0-9]* good keywords')"
+)
+
 # Function to calculate score
 def calculate_score(url, title, description, languages, good_keywords, bad_keywords):
     try:
@@ -290,11 +333,51 @@ def calculate_score(url, title, description, languages, good_keywords, bad_keywo
         error_handler("counting keywords", title, e)
         return "Maybe", "Error"
 
+# Vectorized version of calculate_score for re-scoring stored items in bulk
+def calculate_scores(items, good_keywords, bad_keywords, keyword_expansions=None):
+    """
+    Applies the calculate_score rules to a whole DataFrame of stored items at once.
+    Non-English rows are scored on their stored translation when they have one,
+    otherwise on the original text with the keyword expansions of their language.
+
+    :param items: DataFrame with url, title, description, title_translated, description_translated and languages columns.
+    :return: A DataFrame with the same index and decision, decision_reason columns.
+    """
+    # Work on positions, so duplicate index labels can't mix up rows
+    index = items.index
+    items = items.fillna("").reset_index(drop=True)
+    first_language = items["languages"].str.split(",").str[0].str.strip().str.lower()
+    has_translation = (items["title_translated"].str.strip() != "") | (items["description_translated"].str.strip() != "")
+    use_translation = (first_language != "english") & has_translation
+    title = items["title"].where(~use_translation, items["title_translated"])
+    description = items["description"].where(~use_translation, items["description_translated"])
+    combined_text = (title.str.strip().str.lower() + " " + description.str.strip().str.lower()).str.strip()
+
+    # Each word counts once per occurrence in good_keywords, same as count_keywords
+    words = combined_text.str.split().explode()
+    word_language = first_language.where(~use_translation, "english").reindex(words.index).to_numpy()
+    weights = np.zeros(len(words))
+    for language in set(word_language):
+        keyword_weights = Counter(keywords_for_language(good_keywords, bad_keywords, keyword_expansions, language)[0])
+        in_language = word_language == language
+        weights[in_language] = words[in_language].map(keyword_weights).fillna(0).to_numpy()
+    good_count = pd.Series(weights, index=words.index).groupby(level=0).sum().reindex(items.index, fill_value=0).astype(int)
+
+    url = items["url"].str.strip()
+    is_il = url.str.endswith(".il") | url.str.endswith(".il/")
+    is_hebrew = items["languages"].str.contains(r"(?:^|,)\s*hebrew\s*(?:,|$)", case=False, regex=True)
+    conditions = [is_il | is_hebrew, good_count > 0]
+    decision = np.select(conditions, ["Yes", "Yes"], default="Maybe")
+    details = np.select(conditions, ["Hebrew / .il", good_count.astype(str) + " good keywords"], default="No good keywords")
+    return pd.DataFrame({"decision": decision, "decision_reason": details}, index=index)
+
+
+# Sites that are never candidates
+IGNORED_URLS = ["https://www.linkedin.com", "https://x.com", "https://en.wiktionary.org", "https://www.reddit.com", "https://www.amazon.com", "https://twitter.com", "https://www.facebook.com", "https://en.wikipedia.org", "https://www.youtube.com", "https://www.instagram.com", "https://books.google.com", "https://en.wikivoyage.org", "https://www.tiktok.com", "https://www.pinterest.com"]
 
 # Function to filter out ignored URLs
 def filter_ignored_urls(classified_urls):
-    ignored_urls = ["https://www.linkedin.com", "https://x.com", "https://en.wiktionary.org", "https://www.reddit.com", "https://www.amazon.com", "https://twitter.com", "https://www.facebook.com", "https://en.wikipedia.org", "https://www.youtube.com", "https://www.instagram.com", "https://books.google.com", "https://en.wikivoyage.org", "https://www.tiktok.com", "https://www.pinterest.com"]
-    ignored_set = set(ignored_urls)  # Convert to set for faster lookups
+    ignored_set = set(IGNORED_URLS)  # Convert to set for faster lookups
     filtered_urls = [(url, source) for url, source in classified_urls if url not in ignored_set]
     return filtered_urls
     
@@ -363,10 +446,10 @@ def check_and_add_headers(sheet):
         sheet.insert_row(headers, 1)
 
 # Fetch sheets and extract keywords
-def fetch_and_get_keywords(client, sheet_id):
+def fetch_and_get_keywords(client, sheet_id, keywords_id=None):
     """Fetch necessary Google Sheets and extract good and bad keywords."""
     try:
-        keywords_sheet = client.open_by_key(st.secrets["keywords_id"]).worksheet("Keywords")
+        keywords_sheet = client.open_by_key(keywords_id or get_secret("keywords_id")).worksheet("Keywords")
         sure_sheet = client.open_by_key(sheet_id).worksheet("Sure")
         not_sure_sheet = client.open_by_key(sheet_id).worksheet("Not Sure")        
         good_keywords = [kw.lower() for kw in keywords_sheet.col_values(1)[1:]]  # Lowercase good keywords
@@ -379,23 +462,25 @@ def fetch_and_get_keywords(client, sheet_id):
 def process_single_url(url, source, good_keywords, bad_keywords):
     """Process a single URL and return a row of data and its score."""
     timestamp = datetime.now(pytz.timezone('Asia/Jerusalem')).strftime("%Y-%m-%d %H:%M:%S")
+    title = description = lang_text = score = details = good_count = bad_count = None
     try:
         title = get_title(url)
         description = get_description(url)
         languages = detect_language(title, description)
         lang_text = ", ".join(languages) if languages else "unknown"
-        score, details, good_count, bad_count = calculate_score(url, title, description, languages, good_keywords, bad_keywords)
+        good_count, bad_count = count_keywords(title, description, good_keywords, bad_keywords)
+        score, details = calculate_score(url, title, description, languages, good_keywords, bad_keywords)
         row_data = [url, title, description, score, details, source, lang_text, good_count, bad_count, timestamp]
     except Exception as e:
-        st.error(f"Error processing URL '{url}': {e}")
+        get_reporter().error(f"Error processing URL '{url}': {e}")
         row_data = [url, title if title else "Error", description if description else "Error", score if score else "C", details if details else "Error", source if source else "Error", lang_text if lang_text else "Error", good_count if good_count else "Error", bad_count if bad_count else "Error", timestamp if timestamp else "Error"]
     
     return row_data, score
 
 
 # Process URLs and classify them
-def domain_split(client, sheet_id, urls, source_name):
-    keywords_sheet = client.open_by_key(st.secrets["keywords_id"]).worksheet("Keywords")  
+def domain_split(client, sheet_id, urls, source_name, keywords_id=None):
+    keywords_sheet = client.open_by_key(keywords_id or get_secret("keywords_id")).worksheet("Keywords")  
     good_keywords = [kw.lower() for kw in keywords_sheet.col_values(1)[1:]]  # Lowercase good keywords
     bad_keywords = [kw.lower() for kw in keywords_sheet.col_values(3)[1:]]  # Lowercase bad keywords
     headers = ["URL", "Matching Count", "Matching Words", "J Count", "Words", "Source", "Timestamp"]
@@ -403,10 +488,10 @@ def domain_split(client, sheet_id, urls, source_name):
     if len(results_sheet.get_all_values()) <= 1:  # Only the header exists
         results_sheet.insert_row(headers, 1)
     try:
-        with st.status("Working..."):
+        with get_reporter().status("Working..."):
             rows = []
             for url in urls:
-                st.write(f"Working on '{url}'")
+                get_reporter().write(f"Working on '{url}'")
                 timestamp = datetime.now(pytz.timezone('Asia/Jerusalem')).strftime("%Y-%m-%d %H:%M:%S")
                 words = guess_words(extract_domain_from_url(url))
                 matching_count, matching_keywords = calculate_url_score(words, good_keywords)
@@ -414,28 +499,43 @@ def domain_split(client, sheet_id, urls, source_name):
                 row_data = [url, matching_count, ", ".join(matching_keywords), j_count, ", ".join(words), source_name, timestamp]
                 rows.append(row_data)    
             results_sheet.append_rows(rows, value_input_option='RAW')
-        st.success(f"Finished processing '{source_name}'")
+        get_reporter().success(f"Finished processing '{source_name}'")
     except Exception as e:
-        st.error(f"Error processing '{source_name}': {e}")
+        get_reporter().error(f"Error processing '{source_name}': {e}")
 
 # Assuming you have a form for adding/editing items
-def analyze_url(url, good_keywords, bad_keywords):
+def analyze_url(url, good_keywords, bad_keywords, keyword_expansions=None):
+    """
+    Pages in a language with keyword expansions are scored in that language without translating them.
+    Other non-English pages are translated and scored in English.
+    """
     try:
         title = get_title(url)
         description = get_description(url)
+        return analyze_page(url, title, description, good_keywords, bad_keywords, keyword_expansions)
+    except Exception as e:
+        get_reporter().error(f"Error during analysis for URL '{url}': {e}")
+        return "Error", "", "", "", "", "Error", "Error"
+
+# Function to detect languages and score an already fetched title and description
+def analyze_page(url, title, description, good_keywords, bad_keywords, keyword_expansions=None):
+    try:
         languages = detect_language(title, description)
+        language = languages[0] if languages else "unknown"
+        has_expansions = language in (keyword_expansions or {})
+        translated_title = ""
+        translated_description = ""
         # Translate title and description to English
-        if languages and languages[0] != 'english':
+        if language != 'english' and not has_expansions:
             translated_title = translate_to_english(title)
             translated_description = translate_to_english(description)
             decision, details = calculate_score(url, translated_title, translated_description, languages, good_keywords, bad_keywords)
         else:
-            translated_title = ""
-            translated_description = ""
-            decision, details = calculate_score(url, title, description, languages, good_keywords, bad_keywords)
+            good, bad = keywords_for_language(good_keywords, bad_keywords, keyword_expansions, language)
+            decision, details = calculate_score(url, title, description, languages, good, bad)
         
         # Return fetched and translated data
         return title, description, translated_title, translated_description, languages, decision, details
     except Exception as e:
-        st.error(f"Error during analysis for URL '{url}': {e}")
+        get_reporter().error(f"Error during analysis for URL '{url}': {e}")
         return "Error", "", "", "", "", "Error", "Error"